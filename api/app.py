@@ -1,11 +1,39 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 import os
 from werkzeug.utils import secure_filename
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import main
+from mymodule.review_jobs import ReviewJobManager
+from mymodule.recognizer_pool import RecognizerPool
+from mymodule.upload_prefetch import RecognitionPrefetcher
+from mymodule.review_metrics import review_metrics
 app = Flask(__name__)
 
+# 常驻的识别器池，模型在启动时预热，跨请求复用
+recognizer_pool = RecognizerPool(size=1, cache_dir=main.OCR_CACHE_DIR)
+# 上传时开启 prefetch 的文件写入后立即识别，结果进入OCR缓存
+prefetcher = RecognitionPrefetcher(recognizer_pool)
+
+
+def run_review(params, progress_callback=None, cancel_event=None):
+    """借用池中的识别器执行批量审核；先等待上传时排队的预识别完成，之后这些文件直接命中缓存"""
+    prefetcher.wait()
+    with recognizer_pool.acquire(params.get('ocr_mode'), params.get('signature_mode'),
+                                 params.get('resolution')) as recognizer:
+        return main.batch_review_upload(params, progress_callback, cancel_event, recognizer=recognizer)
+
+
+# 后台审核任务，/api/review-upload 提交后立即返回任务ID，前端轮询进度
+review_jobs = ReviewJobManager(run_review)
+
+# 本模块只导入Flask和轻量模块，OCR模型及其依赖（paddleocr、fitz、cv2、numpy）在后台预热线程中导入和加载，
+# 上传等不需要OCR的接口启动后即可服务。debug 模式下重载器的父进程不处理请求，只在实际提供服务的进程中预热；
+# REVIEW_WARM_UP=0 时不预热（如检查导入耗时），第一次审核时再加载
+if ((__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
+        and os.environ.get('REVIEW_WARM_UP', '1') != '0'):
+    recognizer_pool.warm_up()
+
 # 配置上传文件保存目录
 UPLOAD_FOLDER = './uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -26,6 +54,11 @@ def upload_file():
     province_code = request.form.get('province_code', '44')
     unit_code = request.form.get('unit_code', '14655')
     major_code = request.form.get('major_code', '080901')
+    # 边上传边识别：每个PDF写入完成后立即排队OCR
+    prefetch = request.form.get('prefetch', 'false').lower() in ('1', 'true')
+    ocr_mode = request.form.get('ocr_mode', 'page')
+    signature_mode = request.form.get('signature_mode', 'ocr')
+    resolution = request.form.get('resolution', 'fixed')
 
     if 'files' not in request.files:
         return jsonify({'error': '未检测到文件'}), 400
@@ -43,8 +76,19 @@ def upload_file():
                 relative_path = file.filename
                 save_path = os.path.join(app.config['UPLOAD_FOLDER'], relative_path)
                 os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                file.save(save_path)
+                # 先写临时文件再替换：res 中的文件可能是上传文件的硬链接，不能原地覆盖
+                tmp_path = save_path + '.uploading'
+                try:
+                    file.save(tmp_path)
+                    os.replace(tmp_path, save_path)
+                except Exception:
+                    # 写了一半的临时文件不能留在上传目录里
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
                 successful_uploads.append(relative_path)
+                if prefetch and save_path.lower().endswith('.pdf'):
+                    prefetcher.submit(save_path, ocr_mode, signature_mode, resolution)
             except Exception as e:
                 failed_uploads.append(f"{relative_path} (错误: {str(e)})")
         else:
@@ -57,29 +101,104 @@ def upload_file():
     return jsonify({
         'message': message,
         'successful': successful_uploads,
-        'failed': failed_uploads
+        'failed': failed_uploads,
+        'prefetching': prefetcher.pending
     }), 200 if successful_uploads else 400
     
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """就绪检查：OCR模型预热完成前返回503"""
+    if recognizer_pool.ready:
+        return jsonify({'status': 'ready'}), 200
+    if recognizer_pool.warm_up_error:
+        return jsonify({'status': 'error', 'error': recognizer_pool.warm_up_error}), 503
+    return jsonify({'status': 'warming_up'}), 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus指标：识别次数和耗时（按文档类型、识别结果）、审核文件数、各环节耗时"""
+    return Response(review_metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _review_params(data):
+    return {
+        'academic_year': data.get('academic_year', '2324'),
+        'province_code': data.get('province_code', '44'),
+        'unit_code': data.get('unit_code', '14655'),
+        'major_code': data.get('major_code', '080901'),
+        'ocr_mode': data.get('ocr_mode', 'page'),  # region: 只识别所需区域
+        'signature_mode': data.get('signature_mode', 'ocr'),  # ink: 签名标签之后检测墨迹，不明显时仍按文字判断
+        'resolution': data.get('resolution', 'fixed'),  # adaptive: 低分辨率粗识别，失败的区域再高分辨率重识别
+        'compression': data.get('compression', 'auto'),  # 支撑材料压缩包：store/deflate/auto
+        'placement': data.get('placement', 'auto'),  # copy: 总是复制到res；auto: 优先写时复制或硬链接
+        'keep_layouts': data.get('keep_layouts', False),  # 保存原始识别版面，供修改识别规则后离线回放
+        'workers': data.get('workers', 1),  # 并行OCR进程数
+        'batch_size': data.get('batch_size', 1),  # 合并推理的文件数
+        'incremental': data.get('incremental', False),  # 只审核新增或修改过的文件
+        'resume': data.get('resume', False),  # 从上次中断或停止的批次继续
+        'timeout': data.get('timeout', 0),  # 单个文件识别时限（秒），超时的文件记为失败；0为不限
+        'memory_limit_mb': data.get('memory_limit_mb', 0),  # 识别进程内存上限（MB）；0为不限
+        'recycle_after': data.get('recycle_after', 100)  # 受监控识别时每个进程识别多少个文件后换新进程
+    }
+
+
+def _review_message(total, success_count, fail_count):
+    return f"共找到{total}个PDF，成功{success_count}个，失败{fail_count}个"
+
+
 @app.route('/api/review-upload', methods=['POST'])
 def review_upload_folder():
-    """批量审核 uploads 目录下所有pdf文件"""
+    """批量审核 uploads 目录下所有pdf文件，默认提交后台任务并返回任务ID；wait为true时同步审核"""
     try:
         # 支持参数从json body接收
-        data = request.get_json() or {}
-        params = {
-            'academic_year': data.get('academic_year', '2324'),
-            'province_code': data.get('province_code', '44'),
-            'unit_code': data.get('unit_code', '14655'),
-            'major_code': data.get('major_code', '080901')
-        }
-        result = main.batch_review_upload(params)
+        data = request.get_json(silent=True) or {}
+        params = _review_params(data)
+        job = review_jobs.submit(params)
+        if not data.get('wait', False):
+            return jsonify({
+                "message": "审核任务已提交",
+                "job_id": job.job_id
+            }), 202
+
+        # 同步模式同样经任务队列执行，避免与后台任务同时改写Excel和res目录
+        review_jobs.wait(job)
+        if job.status == "failed":
+            raise Exception(job.error)
+        result = job.result
         return jsonify({
-            "message": f"共找到{result['total']}个PDF，成功{result['success_count']}个，失败{result['fail_count']}个",
-            "details": result["details"]
+            "message": _review_message(result['total'], result['success_count'], result['fail_count']),
+            "details": result["details"],
+            "stopped": result["stopped"]
         }), 200
     except Exception as e:
         return jsonify({'error': f'批量审核失败: {str(e)}'}), 500
 
 
+@app.route('/api/review-jobs/<job_id>', methods=['GET'])
+def review_job_status(job_id):
+    """查询审核任务进度和已完成文件的审核明细"""
+    job = review_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+
+    status = job.to_dict()
+    if status["status"] == "done":
+        status["message"] = _review_message(status['total'], status['success_count'], status['fail_count'])
+    else:
+        status["message"] = (f"已处理{status['processed']}/{status['total']}个PDF，"
+                             f"成功{status['success_count']}个，失败{status['fail_count']}个")
+    return jsonify(status), 200
+
+
+@app.route('/api/review-jobs/<job_id>/cancel', methods=['POST'])
+def cancel_review_job(job_id):
+    """取消审核任务，运行中的任务在处理完当前文件后停止"""
+    job = review_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(job.to_dict()), 200
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
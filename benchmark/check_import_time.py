@@ -0,0 +1,56 @@
+"""
+API启动导入耗时检查：在新进程中导入 api/app.py（不预热模型），
+耗时超过预算或导入了OCR相关的重依赖时返回1，可放在提交前或CI中运行
+
+用法: python benchmark/check_import_time.py [--budget 秒] [--repeat 次数]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+# 只有识别时才需要的依赖，导入 app 时不应加载
+HEAVY_MODULES = ("paddleocr", "paddle", "fitz", "pymupdf", "cv2", "numpy", "openpyxl", "mymodule.recognize")
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure() -> dict:
+    env = {**os.environ, "REVIEW_WARM_UP": "0"}
+    output = subprocess.run([sys.executable, "-c", _CHILD], cwd=REPO_DIR / "api", env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查API模块的导入耗时和导入的依赖")
+    parser.add_argument("--budget", type=float, default=0.5, help="导入耗时预算（秒）")
+    parser.add_argument("--repeat", type=int, default=3, help="取多次测量中的最小值，减少冷缓存的影响")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.repeat)]
+    seconds = min(run["seconds"] for run in runs)
+    heavy = sorted({name for run in runs for name in run["modules"]
+                    if name.split(".")[0] in HEAVY_MODULES or name in HEAVY_MODULES})
+    print(f"导入 api/app.py: {seconds:.3f}s（预算 {args.budget:.3f}s）")
+    failed = False
+    if heavy:
+        print(f"导入了识别相关的依赖: {', '.join(heavy)}")
+        failed = True
+    if seconds > args.budget:
+        print("导入耗时超出预算")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+import random
+from pathlib import Path
+from typing import Dict, List
+
+import fitz
+from openpyxl import Workbook
+from openpyxl.utils import column_index_from_string
+
+# 合成语料的页面坐标（pt）。识别器的区域常量是按2倍渲染的像素坐标，
+# 下面每处注释给出对应的区域，文本行左上角落在区域内才会被识别器取用
+A4 = fitz.paper_rect("a4")
+FONT = "china-s"
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何林罗高"
+GIVEN_NAMES = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂"
+TOPICS = ["前端监控平台", "文件管理系统", "图像分类方法", "推荐算法", "智能问答系统",
+          "数据可视化平台", "目标检测模型", "微服务架构", "知识图谱构建", "日志分析系统"]
+SUFFIXES = ["的设计与实现", "的研究", "的对比和评测", "的优化与应用", "的开发"]
+
+
+def make_students(count: int, seed: int) -> List[Dict[str, str]]:
+    """按随机种子生成学生信息，相同参数生成的结果完全一致"""
+    rng = random.Random(seed)
+    students = []
+    for index in range(count):
+        students.append({
+            "student_id": f"2099{index:08d}",
+            "name": rng.choice(SURNAMES) + "".join(rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2))),
+            "title": f"基于{rng.choice(['深度学习', '大语言模型', 'Vue', 'Python', '区块链'])}的"
+                     f"{rng.choice(TOPICS)}{rng.choice(SUFFIXES)}",
+        })
+    return students
+
+
+def _new_page(doc: fitz.Document) -> fitz.Page:
+    return doc.new_page(width=A4.width, height=A4.height)
+
+
+def _text(page: fitz.Page, x: float, baseline: float, text: str, size: float = 12) -> None:
+    page.insert_text((x, baseline), text, fontname=FONT, fontsize=size)
+
+
+def _filler(page: fitz.Page, rng: random.Random, top: float, lines: int) -> None:
+    """正文占位文字，让页面的文本行数量接近真实文档"""
+    for i in range(lines):
+        words = "".join(rng.choice(TOPICS) for _ in range(3))
+        _text(page, 60, top + i * 18, words, size=10.5)
+
+
+def _signature(page: fitz.Page, name: str, rect: fitz.Rect) -> None:
+    """手写签名：把姓名渲染成图片贴入签名区域，不进入文本层，与扫描签名一致"""
+    with fitz.open() as sign_doc:
+        sign_page = sign_doc.new_page(width=rect.width, height=rect.height)
+        sign_page.insert_text((2, rect.height * 0.75), name, fontname=FONT, fontsize=rect.height * 0.6)
+        pixmap = sign_page.get_pixmap(matrix=fitz.Matrix(3, 3), alpha=False)
+    page.insert_image(rect, pixmap=pixmap)
+
+
+def thesis(student: Dict[str, str], rng: random.Random, signed: bool = True) -> fitz.Document:
+    doc = fitz.open()
+    page = _new_page(doc)
+    _text(page, 150, 80, "深圳技术大学本科毕业设计（论文）", size=16)
+    # THESIS_TITLE_REGIONS: y 100~400pt
+    _text(page, 60, 220, f"题目：{student['title']}", size=14)
+    # STUDENT_ID_REGION_THESIS: x 250~450pt, y 450~650pt
+    _text(page, 60, 500, f"学生姓名：{student['name']}")
+    _text(page, 260, 520, f"学号：{student['student_id']}")
+    _text(page, 60, 560, "专业：计算机科学与技术")
+    _text(page, 60, 600, "指导教师：李强")
+
+    # 第二页与真实的诚信声明一致：正文占满版心、行数不定，“作者签名”一行随正文长短上下移动，
+    # 签名紧跟在标签之后，下方是日期行；签名检测须按标签定位，不能用固定区域
+    page = _new_page(doc)
+    _text(page, 110, 110, "深圳技术大学本科毕业论文（设计）诚信声明", size=16)
+    declaration = (f"本人郑重声明：所呈交的毕业论文（设计），题目《{student['title']}》是本人在指导教师的指导下，"
+                   "独立进行研究工作所取得的成果。对本文的研究做出重要贡献的个人和集体，均已在文中以明确方式注明。"
+                   "除此之外，本论文不包含任何其他个人或集体已经发表或撰写过的作品成果。本人完全意识到本声明的法律结果。")
+    chars_per_line = 36
+    lines = [declaration[i:i + chars_per_line] for i in range(0, len(declaration), chars_per_line)]
+    lines += ["本人承诺论文（设计）中的数据、图表均真实可靠。"] * rng.randint(0, 2)
+    for i, line in enumerate(lines):
+        _text(page, 60, 250 + i * 25, line)
+    label_y = 250 + len(lines) * 25 + rng.randint(70, 130)
+    _text(page, 250, label_y, "毕业论文（设计）作者签名：")
+    if signed:
+        _signature(page, student["name"], fitz.Rect(410, label_y - 18, 490, label_y + 6))
+    _text(page, 320, label_y + 32, "日期：      年   月   日")
+    return doc
+
+
+def report(student: Dict[str, str], rng: random.Random) -> fitz.Document:
+    doc = fitz.open()
+    page = _new_page(doc)
+    # STUDENT_ID_REGION_REPORT: x 40~250pt, y 175~195pt
+    _text(page, 60, 190, f"学号：{student['student_id']}", size=10)
+    # REPORT_TITLE_REGION: y 150~400pt
+    _text(page, 60, 232, "文本复制检测报告单（全文标明引文）", size=14)
+    _text(page, 60, 262, f"篇名：{student['title']}")
+    _text(page, 60, 282, f"作者：{student['name']}")
+    _filler(page, rng, 420, 16)
+    return doc
+
+
+def ktbg(student: Dict[str, str], rng: random.Random) -> fitz.Document:
+    doc = fitz.open()
+    page = _new_page(doc)
+    # KTBG_TITLE_REGION: y 0~220pt；STUDENT_ID_REGION_KTBG: x 97~500pt, y 0~220pt
+    _text(page, 60, 60, "深圳技术大学本科毕业设计（论文）开题报告", size=16)
+    _text(page, 60, 120, f"题目 {student['title']}", size=14)
+    _text(page, 60, 170, f"学生姓名 {student['name']}")
+    _text(page, 250, 170, f"学号 {student['student_id']}")
+    _filler(page, rng, 260, 24)
+    return doc
+
+
+def grade(student: Dict[str, str], rng: random.Random) -> fitz.Document:
+    doc = fitz.open()
+    page = _new_page(doc)
+    _text(page, 150, 80, "毕业设计（论文）成绩考核表", size=16)
+    # STUDENT_ID_REGION_CJKH: x 250~500pt, y 150~250pt
+    _text(page, 60, 180, f"姓名：{student['name']}")
+    _text(page, 260, 180, f"学号：{student['student_id']}")
+    _filler(page, rng, 300, 20)
+    return doc
+
+
+def task_book(student: Dict[str, str], rng: random.Random) -> fitz.Document:
+    """任务书：属于需跳过的过程性材料"""
+    doc = fitz.open()
+    page = _new_page(doc)
+    _text(page, 150, 220, "毕业设计（论文）任务书", size=16)
+    _text(page, 60, 260, f"题目：{student['title']}", size=14)
+    _filler(page, rng, 320, 20)
+    return doc
+
+
+def rasterize(doc: fitz.Document, rng: random.Random) -> fitz.Document:
+    """模拟扫描件：整页转为图片，去掉文本层，底色略灰"""
+    scanned = fitz.open()
+    for page in doc:
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)
+        pixmap.tint_with(0x000000, rng.choice([0xF0F0F0, 0xE8E8E8, 0xFFFFFF]))
+        new_page = scanned.new_page(width=page.rect.width, height=page.rect.height)
+        new_page.insert_image(new_page.rect, pixmap=pixmap)
+    return scanned
+
+
+def write_excel(students: List[Dict[str, str]], excel_path: Path) -> None:
+    """生成与 res/学生论文题目.xlsx 列布局一致的学生名单（学号I列、题目U列，共到AA列）"""
+    wb = Workbook()
+    sheet = wb.active
+    last_col = column_index_from_string("AA")
+    sheet.cell(row=1, column=column_index_from_string("I"), value="学号")
+    sheet.cell(row=1, column=column_index_from_string("U"), value="论文题目")
+    sheet.cell(row=1, column=last_col, value="查重报告文件名称")
+    for row, student in enumerate(students, start=2):
+        sheet.cell(row=row, column=column_index_from_string("C"), value=student["name"])
+        sheet.cell(row=row, column=column_index_from_string("I"), value=student["student_id"])
+        sheet.cell(row=row, column=column_index_from_string("U"), value=student["title"])
+    excel_path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(str(excel_path))
+
+
+def generate(upload_dir: Path, excel_path: Path, students: int = 20, seed: int = 0,
+             scanned_ratio: float = 0.5, task_book_every: int = 5, unsigned_every: int = 10) -> Dict[str, int]:
+    """
+    生成合成语料：每个学生一篇论文、一份查重报告、一份开题报告和一份成绩考核表，
+    每 task_book_every 个学生附带一份任务书（应被跳过），每 unsigned_every 篇论文有一篇未签名（应失败）；
+    scanned_ratio 比例的文件转为无文本层的扫描件，走OCR路径。返回各类文件数量
+    """
+    rng = random.Random(seed)
+    counts: Dict[str, int] = {}
+    for index, student in enumerate(make_students(students, seed)):
+        student_dir = upload_dir / f"{student['student_id']}-{student['name']}"
+        student_dir.mkdir(parents=True, exist_ok=True)
+        files = {
+            "thesis": ("毕业论文.pdf", thesis(student, rng, signed=unsigned_every <= 0 or index % unsigned_every != 1)),
+            "report": ("查重报告.pdf", report(student, rng)),
+            "ktbg": ("开题报告.pdf", ktbg(student, rng)),
+            "grade": ("成绩考核表.pdf", grade(student, rng)),
+        }
+        if task_book_every > 0 and index % task_book_every == 0:
+            files["skip"] = ("任务书.pdf", task_book(student, rng))
+
+        for kind, (file_name, doc) in files.items():
+            if rng.random() < scanned_ratio:
+                doc, original = rasterize(doc, rng), doc
+                original.close()
+            # 不写入随机文档ID，相同参数生成的文件逐字节一致，语料指纹可用于判断结果是否可比
+            doc.save(str(student_dir / f"{student['student_id']}_{file_name}"), garbage=3, deflate=True, no_new_id=True)
+            doc.close()
+            counts[kind] = counts.get(kind, 0) + 1
+
+    write_excel(make_students(students, seed), excel_path)
+    return counts
@@ -0,0 +1,364 @@
+"""
+审核流程基准测试
+
+生成固定随机种子的合成语料（论文、查重报告、开题报告、成绩考核表、任务书，按比例混入扫描件），
+在独立的临时工作目录和子进程中运行：
+  - 分阶段：逐文件渲染首页、读取文本层、识别（identify_document），统计各自的单文件耗时
+  - 端到端：batch_review_upload，统计吞吐（文件/秒）、单文件耗时 p50/p95、各环节耗时占比
+并记录子进程峰值内存。结果写入 benchmark/results/，指定 --baseline 时与基线比较，退步超过容差则返回非零退出码。
+
+用法：
+    python benchmark/run_benchmark.py --students 20 --repeat 3
+    python benchmark/run_benchmark.py --ocr-mode region --batch-size 8 --baseline benchmark/results/xxx.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+MODEL_DIRS = ["PP-OCRv5_server_det"]
+
+# 与基线比较的指标：(路径, 越大越好)
+COMPARED_METRICS = [
+    (("review", "files_per_sec"), True),
+    (("review", "latency_p50"), False),
+    (("review", "latency_p95"), False),
+    (("recognize", "latency_p95"), False),
+    (("peak_rss_mb",), False),
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """最近秩百分位数，values 为空时返回0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(latencies),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_max": max(latencies) if latencies else 0.0,
+    }
+
+
+# ---------------------------------------------------------------- 子进程：实际运行基准
+
+
+def _stage_totals(outcome: Dict[str, Any]) -> Dict[str, float]:
+    """汇总 batch_review_upload 结果中逐文件和整批共用环节的耗时"""
+    totals: Dict[str, float] = {}
+    timings = [detail.get("timings", {}) for detail in outcome["details"]]
+    timings.append({stage: seconds for stage, seconds in outcome.get("timings", {}).items() if stage != "total"})
+    for stage_timings in timings:
+        for stage, seconds in stage_timings.items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+    return totals
+
+
+def _reset_outputs(workspace: Path) -> None:
+    """每轮端到端运行前恢复初始状态：清空输出目录，还原Excel"""
+    for name in ("res", "recognition_results"):
+        shutil.rmtree(workspace / name, ignore_errors=True)
+    (workspace / "res").mkdir()
+    shutil.copyfile(workspace / "students.xlsx", workspace / "res" / "学生论文题目.xlsx")
+
+
+def run_child(config: Dict[str, Any]) -> Dict[str, Any]:
+    import logging
+    import resource
+
+    # 先配置日志，main.setup_logging 的 basicConfig 随之失效，避免日志输出影响计时
+    logging.basicConfig(level=logging.WARNING)
+    workspace = Path.cwd()
+    sys.path.insert(0, str(workspace))
+    import main
+    from mymodule.pdf_pages import PdfPages
+    from mymodule.recognize import DocumentRecognizer
+
+    params = dict(config["params"])
+    pdf_files = sorted((workspace / "api" / "uploads").rglob("*.pdf"))
+    result: Dict[str, Any] = {}
+
+    recognizer = DocumentRecognizer(ocr_mode=params.get("ocr_mode", "page"), cache_dir=None,
+                                    signature_mode=params.get("signature_mode", "ocr"),
+                                    resolution=params.get("resolution", "fixed"))
+    start = time.perf_counter()
+    recognizer.ocr  # 模型加载单独计时，不计入各轮耗时
+    result["model_load_sec"] = time.perf_counter() - start
+
+    # 分阶段
+    render, text_layer, recognize = [], [], []
+    for pdf_file in pdf_files:
+        with PdfPages(pdf_file) as pages:
+            start = time.perf_counter()
+            pages.render(0)
+            render.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            pages.text_lines(0)
+            text_layer.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        try:
+            recognizer.identify_document(pdf_file)
+        except Exception:
+            pass  # 任务书、未签名论文等识别失败是语料的一部分
+        recognize.append(time.perf_counter() - start)
+    result["render"] = latency_stats(render)
+    result["text_layer"] = latency_stats(text_layer)
+    result["recognize"] = latency_stats(recognize)
+
+    # 端到端：各环节耗时取自审核结果中的 timings
+    runs = []
+    for _ in range(config["repeat"]):
+        _reset_outputs(workspace)
+        latencies = []
+        last = [time.perf_counter()]
+
+        def on_progress(processed, total, detail):
+            now = time.perf_counter()
+            if detail is not None:
+                latencies.append(now - last[0])
+            last[0] = now
+
+        start = time.perf_counter()
+        outcome = main.batch_review_upload(dict(params), progress_callback=on_progress, recognizer=recognizer)
+        wall = time.perf_counter() - start
+        runs.append({
+            "wall_sec": wall,
+            "files_per_sec": outcome["total"] / wall if wall > 0 else 0.0,
+            "success_count": outcome["success_count"],
+            "fail_count": outcome["fail_count"],
+            "latencies": latencies,
+            "stages": _stage_totals(outcome),
+            # 自适应分辨率下发生高分辨率重识别的文件数和重识别次数
+            "escalated_files": sum(1 for detail in outcome["details"] if detail.get("escalations")),
+            "escalations": sum(sum(detail.get("escalations", {}).values()) for detail in outcome["details"]),
+            "prefilter": outcome.get("prefilter", {}),
+        })
+    result["runs"] = runs
+
+    to_mb = 1 / 1024  # Linux 下 ru_maxrss 单位为KB
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * to_mb
+    result["peak_rss_children_mb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * to_mb
+    return result
+
+
+# ---------------------------------------------------------------- 主进程：准备语料、汇总、比较
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _corpus_digest(upload_dir: Path) -> str:
+    """语料内容指纹，基线与本次语料不同时两者不可比"""
+    digest = hashlib.sha256()
+    for pdf_file in sorted(upload_dir.rglob("*.pdf")):
+        digest.update(str(pdf_file.relative_to(upload_dir)).encode("utf-8"))
+        digest.update(pdf_file.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def prepare_workspace(workspace: Path, args) -> Dict[str, Any]:
+    """工作目录布局与项目一致（main.py 按自身所在目录查找 api/uploads 和 res），只是换成合成语料和学生名单"""
+    import corpus
+
+    workspace.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(REPO_DIR / "main.py", workspace / "main.py")
+    os.symlink(REPO_DIR / "mymodule", workspace / "mymodule")
+    for model_dir in MODEL_DIRS:
+        if (REPO_DIR / model_dir).exists():
+            os.symlink(REPO_DIR / model_dir, workspace / model_dir)
+
+    upload_dir = workspace / "api" / "uploads"
+    counts = corpus.generate(upload_dir, workspace / "students.xlsx", students=args.students, seed=args.seed,
+                             scanned_ratio=args.scanned_ratio)
+    return {
+        "students": args.students,
+        "seed": args.seed,
+        "scanned_ratio": args.scanned_ratio,
+        "files": counts,
+        "digest": _corpus_digest(upload_dir),
+    }
+
+
+def summarize(child: Dict[str, Any]) -> Dict[str, Any]:
+    """多轮结果汇总：吞吐取各轮中位数，耗时分位数按所有轮次的单文件耗时合并计算"""
+    runs = child["runs"]
+    latencies = [latency for run in runs for latency in run["latencies"]]
+    stage_names = sorted({stage for run in runs for stage in run["stages"]})
+    wall = percentile([run["wall_sec"] for run in runs], 50)
+    stages = {}
+    for stage in stage_names:
+        seconds = percentile([run["stages"].get(stage, 0.0) for run in runs], 50)
+        stages[stage] = {"sec": seconds, "share": seconds / wall if wall > 0 else 0.0}
+    review = {
+        "repeat": len(runs),
+        "wall_sec": wall,
+        "files_per_sec": percentile([run["files_per_sec"] for run in runs], 50),
+        "success_count": runs[-1]["success_count"],
+        "fail_count": runs[-1]["fail_count"],
+        "escalated_files": runs[-1].get("escalated_files", 0),
+        "escalations": runs[-1].get("escalations", 0),
+        "prefilter": runs[-1].get("prefilter", {}),
+        **latency_stats(latencies),
+        "stages": stages,
+    }
+    return {
+        "model_load_sec": child["model_load_sec"],
+        "render": child["render"],
+        "text_layer": child["text_layer"],
+        "recognize": child["recognize"],
+        "review": review,
+        "peak_rss_mb": child["peak_rss_mb"],
+        "peak_rss_children_mb": child["peak_rss_children_mb"],
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """返回退步超过容差的指标说明"""
+    if current["corpus"]["digest"] != baseline["corpus"]["digest"]:
+        print("警告: 基线使用的语料与本次不同，结果不可直接比较")
+    if current["params"] != baseline["params"]:
+        print("警告: 基线使用的审核参数与本次不同")
+
+    regressions = []
+    for path, higher_is_better in COMPARED_METRICS:
+        now, before = current["metrics"], baseline["metrics"]
+        for key in path:
+            now, before = now[key], before[key]
+        if before == 0:
+            continue
+        change = (now - before) / before
+        worse = -change if higher_is_better else change
+        flag = "退步" if worse > tolerance else ""
+        print(f"  {'.'.join(path):<24} {before:>10.4f} -> {now:>10.4f} ({change:+.1%}) {flag}")
+        if worse > tolerance:
+            regressions.append(f"{'.'.join(path)} {change:+.1%}")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    metrics = report["metrics"]
+    review = metrics["review"]
+    print(f"语料: {report['corpus']['files']} 指纹 {report['corpus']['digest']}")
+    print(f"参数: {report['params']}")
+    print(f"模型加载: {metrics['model_load_sec']:.2f}s")
+    for stage in ("render", "text_layer", "recognize"):
+        stats = metrics[stage]
+        print(f"{stage:<12} 单文件 p50 {stats['latency_p50'] * 1000:8.1f}ms  p95 {stats['latency_p95'] * 1000:8.1f}ms")
+    print(f"端到端({review['repeat']}轮): {review['files_per_sec']:.2f} 文件/秒, "
+          f"p50 {review['latency_p50'] * 1000:.1f}ms, p95 {review['latency_p95'] * 1000:.1f}ms, "
+          f"成功 {review['success_count']} 失败 {review['fail_count']}")
+    if review.get("escalations"):
+        print(f"  高分辨率重识别: {review['escalated_files']} 个文件，{review['escalations']} 次")
+    if review.get("prefilter", {}).get("rejected"):
+        prefilter = review["prefilter"]
+        print(f"  预分类提前拒绝: {prefilter['rejected']} 个文件 {prefilter['methods']}，"
+              f"估计节省 {prefilter['saved_seconds']:.2f}s")
+    for stage, stats in sorted(review["stages"].items(), key=lambda item: -item[1]["sec"]):
+        print(f"  {stage:<12} {stats['sec']:8.3f}s  {stats['share']:6.1%}")
+    print(f"峰值内存: {metrics['peak_rss_mb']:.1f}MB (子进程 {metrics['peak_rss_children_mb']:.1f}MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="审核流程基准测试")
+    parser.add_argument("--students", type=int, default=20, help="合成语料的学生数，每人4~5个文件")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scanned-ratio", type=float, default=0.5, help="转为扫描件（无文本层）的文件比例")
+    parser.add_argument("--repeat", type=int, default=3, help="端到端运行轮数")
+    parser.add_argument("--ocr-mode", default="page", choices=["page", "region"])
+    parser.add_argument("--signature-mode", default="ocr", choices=["ocr", "ink"])
+    parser.add_argument("--resolution", default="fixed", choices=["fixed", "adaptive"])
+    parser.add_argument("--compression", default="auto", choices=["store", "deflate", "auto"])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=0, help="单个文件识别时限（秒），0为不限")
+    parser.add_argument("--memory-limit-mb", type=float, default=0, help="识别进程内存上限（MB），0为不限")
+    parser.add_argument("--workspace", type=Path, help="工作目录，默认使用临时目录并在结束后删除")
+    parser.add_argument("--output", type=Path, help="结果文件，默认 benchmark/results/<时间>.json")
+    parser.add_argument("--baseline", type=Path, help="与之比较的基线结果文件")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的退步比例")
+    parser.add_argument("--verbose", action="store_true", help="显示子进程输出")
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        config = json.loads(args.child.read_text(encoding="utf-8"))
+        child_result = run_child(config)
+        Path(config["output"]).write_text(json.dumps(child_result), encoding="utf-8")
+        return 0
+
+    params = {
+        "academic_year": "2324", "province_code": "44", "unit_code": "14655", "major_code": "080901",
+        "ocr_mode": args.ocr_mode, "signature_mode": args.signature_mode, "resolution": args.resolution,
+        "compression": args.compression,
+        "workers": args.workers, "batch_size": args.batch_size,
+        "timeout": args.timeout, "memory_limit_mb": args.memory_limit_mb,
+    }
+    workspace = args.workspace or Path(tempfile.mkdtemp(prefix="review-bench-"))
+    try:
+        corpus_info = prepare_workspace(workspace, args)
+        config_path = workspace / "bench_config.json"
+        child_output = workspace / "bench_child.json"
+        config_path.write_text(json.dumps({"params": params, "repeat": args.repeat,
+                                           "output": str(child_output)}), encoding="utf-8")
+        output = None if args.verbose else subprocess.DEVNULL
+        subprocess.run([sys.executable, str(Path(__file__).resolve()), "--child", str(config_path)],
+                       cwd=workspace, check=True, stdout=output, stderr=output)
+        child_result = json.loads(child_output.read_text(encoding="utf-8"))
+    finally:
+        if args.workspace is None:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    report = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": params,
+        "corpus": corpus_info,
+        "metrics": summarize(child_result),
+    }
+    print_report(report)
+
+    output_path = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report['revision']}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"结果已保存: {output_path}")
+
+    if args.baseline:
+        print(f"与基线比较 {args.baseline}:")
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"性能退步超过 {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,98 @@
-import sys
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
-from mymodule.recognize import DocumentRecognizer
+from typing import TYPE_CHECKING
 from mymodule.rename import FileRenamer
 from mymodule.compress import DocumentCompressor
-from mymodule.excel_handle import ExcelHandler
+from mymodule.review_manifest import ReviewManifest
+from mymodule.review_journal import ReviewJournal
+from mymodule.recognize_watchdog import RecognitionWatchdog
+from mymodule.result_store import RecognitionResultStore
+from mymodule.review_metrics import StageTimer, review_metrics, rounded_timings
 import logging
+import time
 from datetime import datetime
 
+# 识别（paddleocr、fitz、cv2、numpy）和Excel（openpyxl）相关模块在用到时才导入，API导入本模块时不必加载
+if TYPE_CHECKING:
+    from mymodule.recognize import DocumentRecognizer
+
 BASE_DIR = Path(__file__).resolve().parent
+OCR_CACHE_DIR = Path(".") / "ocr_cache"  # 识别结果缓存目录
+LAYOUT_DIR = Path(".") / "ocr_layouts"  # 原始识别版面目录，供修改识别规则后离线回放
+_logging_configured = False
+
+
+class FatalReviewError(Exception):
+    """必须停止整批审核的错误（如第一次题目比对失败，多半是Excel或命名参数选错），已完成的结果仍保留"""
+
+
+class PendingDocument:
+    """已开始处理、尚未完成的文件：识别结果、本文件各环节耗时，以及进行中的放置"""
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self.timer = StageTimer()
+        self.result = None
+        self.error = None  # 识别或放置前出错时的异常
+        self.placement = None  # 放置的Future，同步放置时为重命名后的路径
+
+    @property
+    def ready(self) -> bool:
+        """可以立即完成，不必等待放置"""
+        return not isinstance(self.placement, Future) or self.placement.done()
+
+    def placed(self) -> Path:
+        """重命名后的路径，放置尚未完成时等待，放置失败时抛出其异常"""
+        if isinstance(self.placement, Future):
+            return self.placement.result()
+        return self.placement
+
 
 class DocumentProcessor:
+    PARALLEL_COMPRESS_MIN = 4  # 待打包的学生数达到该值时并行打包
+    PIPELINE_DEPTH = 4  # 批量审核时已识别、等待放置完成的文件数上限
+
     def __init__(self, academic_year: str = "2324", 
                  province_code: str = "44",
                  unit_code: str = "14655", 
-                 major_code: str = "080901"):
-        self.recognizer = DocumentRecognizer()
+                 major_code: str = "080901",
+                 ocr_mode: str = "page",
+                 signature_mode: str = "ocr",
+                 resolution: str = "fixed",
+                 compression: str = "auto",
+                 placement: str = "auto",
+                 use_cache: bool = True,
+                 keep_layouts: bool = False,
+                 recognizer: "DocumentRecognizer" = None):
+        from mymodule.excel_handle import ExcelHandler
+        from mymodule.layout_store import LayoutStore
+
+        # 传入常驻的识别器时直接复用，不再重新加载OCR模型
+        if recognizer is None:
+            from mymodule.recognize import DocumentRecognizer
+
+
+            # 按文件内容缓存识别结果，重复审核未变化的PDF时不再OCR
+            recognizer = DocumentRecognizer(ocr_mode=ocr_mode, cache_dir=OCR_CACHE_DIR if use_cache else None,
+                                            signature_mode=signature_mode, resolution=resolution)
+        self.recognizer = recognizer
+        self.cache_dir = recognizer.cache_dir
+        # 是否保存原始识别版面按本次审核的参数设置；识别器池借出的识别器归还时恢复原设置
+        recognizer.layout_store = LayoutStore(LAYOUT_DIR) if keep_layouts else None
         self.renamer = FileRenamer(
             academic_year=academic_year,
             province_code=province_code,
             unit_code=unit_code,
-            major_code=major_code
+            major_code=major_code,
+            placement=placement
         )
-        self.compressor = DocumentCompressor()
+        self.compressor = DocumentCompressor(policy=compression)
+        self.compress_workers = min(4, os.cpu_count() or 1)  # 并行打包的线程数
+        self.io_workers = min(4, os.cpu_count() or 1)  # 批量审核时放置文件的线程数
+        self._placements = {}  # 学号 -> 该学号最近一次放置的Future，同一学号的文件按顺序放置
         self.excel_handler = ExcelHandler(BASE_DIR / "res" / "学生论文题目.xlsx")
 
         # 设置目录结构
@@ -31,11 +102,25 @@ class DocumentProcessor:
         self.input_dir = BASE_DIR / "api" / "uploads"  # 输入文件目录
         self.log_dir = self.root_dir / "logs"
         self.compress_files = {}  # 学号 -> 文件列表的映射
+        self.last_result = None  # 最近一次 process_document 的识别结果
+        self.last_timings = {}  # 最近一次 process_document 各环节耗时（秒）
+        self.last_effects = {}  # 最近一次 process_document 的副作用，记入审核日志供中断后继续
+        self.batch_timings = StageTimer()  # 整批共用环节（压缩、保存Excel）的耗时
 
         self.create_directory_structure()
 
         self.setup_logging()
 
+        # 识别结果库，首次创建时导入旧版按学号保存的JSON文件
+        db_path = self.json_dir / RecognitionResultStore.DB_NAME
+        new_store = not db_path.exists()
+        self.result_store = RecognitionResultStore(db_path)
+        if new_store:
+            imported = self.result_store.import_json_tree(self.json_dir)
+            if imported:
+                logging.info(f"已导入 {imported} 条旧版JSON识别结果")
+        self.pending_results = []  # 待批量写入结果库的 (识别结果, 学号, 来源文件)
+
     def create_directory_structure(self):
         dirs = [self.res_dir, self.json_dir, self.input_dir, self.log_dir]
         for dir_path in dirs:
@@ -44,6 +129,12 @@ class DocumentProcessor:
 
     def setup_logging(self):  # 设置日志配置
 
+        # 同一进程只配置一次，常驻的API进程不必每次请求都新建日志文件
+        global _logging_configured
+        if _logging_configured:
+            return
+        _logging_configured = True
+
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         log_file = self.log_dir / f"document_processing_{timestamp}.log"
 
@@ -56,43 +147,113 @@ class DocumentProcessor:
             ]
         )
 
-    def process_document(self, file_path: Path) -> bool:
-
-
-        global renamed_path
+    def process_document(self, file_path: Path, recognition_result: dict = None,
+                         recognize_seconds: float = None) -> bool:
+        """
+        处理单个文件；传入 recognition_result 时直接使用（如进程池中已识别），不再重复OCR，
+        此时 recognize_seconds 为在别处识别该文件的耗时
+        各环节耗时记录在 self.last_timings 中
+        """
+        return self.finish_document(self.start_document(file_path, recognition_result, recognize_seconds))
+
+    def start_document(self, file_path: Path, recognition_result: dict = None, recognize_seconds: float = None,
+                       io_executor: ThreadPoolExecutor = None) -> "PendingDocument":
+        """
+        处理的前半段：识别（未传入识别结果时），并开始把论文/检测报告放置到res下的学号目录
+        传入 io_executor 时在I/O线程中放置，调用方可以接着识别下一个文件；同一学号的文件按调用顺序放置
+        出错时不抛出，留给 finish_document 按处理失败记录
+        """
+        pending = PendingDocument(file_path)
         try:
             logging.info(f"开始处理文件: {file_path}")
 
             # 文件识别
-            recognition_result = self.recognizer.identify_document(file_path)
+            if recognition_result is None:
+                start = time.perf_counter()
+                try:
+                    recognition_result = self.recognizer.identify_document(file_path)
+                except Exception:
+                    self.record_recognition(None, time.perf_counter() - start, pending.timer.timings)
+                    raise
+                recognize_seconds = time.perf_counter() - start
+            self.record_recognition(recognition_result, recognize_seconds, pending.timer.timings)
+            pending.result = recognition_result
             student_id = recognition_result.get('student_id')
 
-            if recognition_result.get('type') == 'ktbg' or recognition_result.get('type') == 'grade':
-                if student_id not in self.compress_files:
-                    self.compress_files[student_id] = []
-                self.compress_files[student_id].append((file_path, recognition_result))
-                logging.info(f"添加文件到待压缩列表: {file_path}")
-
             # 在res目录下创建学号目录
             student_res_dir = self.res_dir / str(student_id)
             student_res_dir.mkdir(exist_ok=True)
             logging.info(f"确保res下的学号目录存在: {student_res_dir}")
 
-            # 保存识别结果到recognition_results下的学号目录
-            json_path = self.recognizer.save_recognition_result(
-                recognition_result,
-                self.json_dir,  # 传入json基础目录，student_id会在JsonHandler中使用
-                student_id
-            )
-            logging.info(f"识别结果已保存: {json_path}")
-
             # 重命名文件并保存到res下的学号目录
             if recognition_result.get('type') == 'thesis' or recognition_result.get('type') == 'report':
-                renamed_path = self.renamer.rename_file(
+                pending.placement = self._submit_placement(file_path, student_id, student_res_dir,
+                                                           recognition_result, pending.timer, io_executor)
+        except Exception as e:
+            pending.error = e
+        return pending
+
+    def _submit_placement(self, file_path: Path, student_id: str, student_res_dir: Path, recognition_result: dict,
+                          timer: StageTimer, io_executor: ThreadPoolExecutor = None):
+        """放置文件，有 io_executor 时返回Future，否则直接放置并返回重命名后的路径"""
+        def place():
+            with timer.stage("rename"):
+                return self.renamer.rename_file(
                     file_path,
-                    json_path,
-                    student_res_dir
+                    None,
+                    student_res_dir,
+                    result=recognition_result  # 直接使用内存中的识别结果
                 )
+
+        if io_executor is None:
+            return place()
+
+        previous = self._placements.get(student_id)
+
+        def place_after_previous():
+            # 同一学号的同名文件以后处理的为准，与顺序处理一致；前一个放置失败不影响本文件
+            if previous is not None:
+                wait([previous])
+            return place()
+
+        future = io_executor.submit(place_after_previous)
+        self._placements[student_id] = future
+        return future
+
+    def finish_document(self, pending: "PendingDocument") -> bool:
+        """
+        处理的后半段，须按文件顺序调用：登记待压缩列表和结果库，等待放置完成后更新Excel
+        本文件的识别结果、各环节耗时和副作用记录在 self.last_result、self.last_timings、self.last_effects 中
+        """
+        from mymodule.excel_handle import TitleMismatchError
+
+        file_path = pending.file_path
+        timer = pending.timer
+        self.last_result = pending.result
+        self.last_effects = effects = {}
+        self.last_timings = timer.timings
+        try:
+            if pending.error is not None:
+                raise pending.error
+            recognition_result = pending.result
+            student_id = recognition_result.get('student_id')
+
+            if recognition_result.get('type') == 'ktbg' or recognition_result.get('type') == 'grade':
+                if student_id not in self.compress_files:
+                    self.compress_files[student_id] = []
+                self.compress_files[student_id].append((file_path, recognition_result))
+                effects["compress"] = True
+                logging.info(f"添加文件到待压缩列表: {file_path}")
+
+            # 识别结果登记到结果库，整批结束时统一写入
+            with timer.stage("save_result"):
+                self.queue_result(recognition_result, student_id, file_path)
+            effects["queued"] = True
+
+            renamed_path = None
+            if pending.placement is not None:
+                renamed_path = pending.placed()
+                effects["renamed"] = str(renamed_path)
                 logging.info(f"文件重命名完成: {renamed_path}")
 
             # 更新Excel
@@ -105,85 +266,264 @@ class DocumentProcessor:
             if doc_type in file_type_mapping:
                 try:
                     file_names = {file_type_mapping[doc_type]: renamed_path.name}
-                    success, message = self.excel_handler.process_student(student_id, file_names, json_path)
+                    with timer.stage("excel"):
+                        success, message = self.excel_handler.process_student(
+                            student_id, file_names, result=recognition_result)
                     if not success:
                         logging.warning(f"Excel更新失败: {message}")
                         return False
                     else:
+                        effects["excel"] = {"student_id": student_id, "file_names": file_names}
                         logging.info(f"Excel更新成功: {message}")
-                except ValueError as e:
-                    # 第一次题目比对失败，打印错误信息并终止程序
+                except TitleMismatchError as e:
+                    # 第一次题目比对失败，停止整批审核；已完成的文件由调用方保存
                     logging.error(f"严重错误: {str(e)}")
-                    sys.exit()
+                    # 该文件没有处理完，继续时重新处理，识别结果届时再写入结果库
+                    if effects.pop("queued", False):
+                        self.pending_results.pop()
+                    raise FatalReviewError(str(e))
             return True
 
-        except SystemExit:
+        except FatalReviewError:
             raise
         except Exception as e:
             logging.error(f"处理文件时出错 {file_path}: {str(e)}")
             return False
+        finally:
+            review_metrics.observe_stages(self.last_timings)
+
+    def queue_result(self, recognition_result: dict, student_id: str, file_path: Path = None) -> None:
+        """登记一条识别结果，由 flush_results 批量写入结果库"""
+        if not student_id:
+            raise Exception("无法保存：识别结果中没有学号")
+        self.pending_results.append((recognition_result, student_id, str(file_path) if file_path else None))
+
+    def flush_results(self) -> None:
+        """把登记的识别结果在一个事务中写入结果库"""
+        if self.pending_results:
+            saved = self.result_store.save_many(self.pending_results)
+            self.pending_results = []
+            logging.info(f"识别结果已保存: {saved} 条")
+
+    def restore_effects(self, file_path: Path, entry: dict) -> None:
+        """
+        继续中断的批次时，恢复审核日志中一个已处理文件的副作用：登记待压缩列表、重做Excel更新，
+        尚未写入结果库的识别结果重新登记；重命名后的文件已在res中，不再处理
+        """
+        from mymodule.excel_handle import TitleMismatchError
+
+        result = entry.get("result")
+        effects = entry.get("effects") or {}
+        self.last_result = result
+        self.last_timings = {}
+        self.last_effects = effects
+        if not result:
+            return
+        student_id = result.get('student_id')
+        if effects.get("compress"):
+            self.compress_files.setdefault(student_id, []).append((file_path, result))
+        if effects.get("queued") and not entry.get("saved"):
+            self.queue_result(result, student_id, file_path)
+        excel = effects.get("excel")
+        if excel:
+            # Excel的修改在整批结束时才保存，中断前的更新可能没有写回，按原顺序重做
+            try:
+                success, message = self.excel_handler.process_student(
+                    excel["student_id"], excel["file_names"], result=result)
+            except TitleMismatchError as e:
+                raise FatalReviewError(str(e))
+            if not success:
+                logging.warning(f"恢复Excel更新失败: {message}")
+
+    def record_recognition(self, recognition_result: dict, seconds: float = None, timings: dict = None) -> None:
+        """
+        记录一次识别的耗时和结果；recognition_result 为None表示识别失败，seconds 为None表示未计时
+        耗时计入 timings，为None时计入 self.last_timings
+        """
+        if seconds is None:
+            return
+        timings = self.last_timings if timings is None else timings
+        timings["recognize"] = timings.get("recognize", 0.0) + seconds
+        if recognition_result is None:
+            review_metrics.observe_recognition("unknown", "error", seconds)
+        else:
+            review_metrics.observe_recognition(recognition_result.get("type"), "ok", seconds)
+            review_metrics.observe_escalations(recognition_result.get("type"),
+                                               recognition_result.get("escalations", {}))
 
     def process_compressed_files(self):  # 压缩
+        from mymodule.excel_handle import TitleMismatchError
 
         try:
-            # 处理每个学号的文件
+            # 确定每个学号压缩包的最终文件名（各文件的识别结果已在 process_document 中保存）
+            # 某个学号的文件名无法生成时记录并跳过该学号，其余学号照常打包
+            archives = []
             for student_id, files in self.compress_files.items():
                 if files:
                     logging.info(f"正在处理学号 {student_id} 的文件")
 
                     first_file_result = files[0][1]  # 获取第一个文件的识别结果
-                    json_path = self.recognizer.save_recognition_result(
-                        first_file_result,
-                        self.json_dir,
-                        student_id
-                    )
-
-                    # 压缩文件
-                    zip_path = self.compressor.compress_files(
-                        files,
-                        student_id,
-                        self.res_dir
-                    )
-
-                    # 重命名zip文件
-                    renamed_zip = self.renamer.rename_file(
-                        zip_path,
-                        json_path,
-                        zip_path.parent
-                    )
-                    logging.info(f"重命名压缩文件成功: {renamed_zip}")
-
-                    # 更新Excel中的支撑材料列
-                    file_names = {'ktbg': renamed_zip.name}
-                    success, message = self.excel_handler.process_student(student_id, file_names, json_path)
-                    if not success:
-                        logging.warning(f"Excel更新失败: {message}")
-                    else:
-                        logging.info(f"Excel更新成功: {message}")
-
-                    if renamed_zip != zip_path and zip_path.exists():
-                        zip_path.unlink()
-                        logging.info(f"删除原始压缩文件: {zip_path}")
+                    try:
+                        # 直接以重命名后的文件名写压缩包，不再先写 <学号>_CL.zip 再复制、删除
+                        zip_name = self.renamer.generate_new_filename(first_file_result, "zip")
+                    except Exception as e:
+                        logging.error(f"学号 {student_id} 的压缩包文件名生成失败，跳过: {str(e)}")
+                        continue
+                    archives.append((student_id, files, first_file_result, zip_name))
+
+            # 压缩文件：学生较多时多线程并行打包（zlib压缩和文件读写期间会释放GIL）
+            # 单个学号打包失败同样只跳过该学号
+            def build(archive):
+                student_id, files, _, zip_name = archive
+                try:
+                    return self.compressor.compress_files(files, student_id, self.res_dir, zip_name)
+                except Exception as e:
+                    logging.error(f"学号 {student_id} 的支撑材料打包失败，跳过: {str(e)}")
+                    return None
+
+            with self.batch_timings.stage("compress"):
+                if self.compress_workers > 1 and len(archives) >= self.PARALLEL_COMPRESS_MIN:
+                    with ThreadPoolExecutor(max_workers=self.compress_workers) as executor:
+                        zip_paths = list(executor.map(build, archives))
+                else:
+                    zip_paths = [build(archive) for archive in archives]
+
+            # 按学号顺序更新Excel中的支撑材料列
+            for (student_id, _, first_file_result, _), zip_path in zip(archives, zip_paths):
+                if zip_path is None:
+                    continue
+                logging.info(f"压缩文件已保存: {zip_path}")
+                file_names = {'ktbg': zip_path.name}
+                try:
+                    with self.batch_timings.stage("excel"):
+                        success, message = self.excel_handler.process_student(
+                            student_id, file_names, result=first_file_result)
+                except TitleMismatchError as e:
+                    logging.error(f"严重错误: {str(e)}")
+                    raise FatalReviewError(str(e))
+                if not success:
+                    logging.warning(f"Excel更新失败: {message}")
+                else:
+                    logging.info(f"Excel更新成功: {message}")
 
         except Exception as e:
             logging.error(f"处理压缩文件时出错: {str(e)}")
             raise
 
 
-def process_single_file(file_path, params):
+def process_single_file(file_path, params, recognizer=None):
     processor = DocumentProcessor(
         academic_year=params['academic_year'],
         province_code=params['province_code'],
         unit_code=params['unit_code'],
-        major_code=params['major_code']
+        major_code=params['major_code'],
+        ocr_mode=params.get('ocr_mode', 'page'),
+        signature_mode=params.get('signature_mode', 'ocr'),
+        resolution=params.get('resolution', 'fixed'),
+        keep_layouts=params.get('keep_layouts', False),
+        recognizer=recognizer
     )
     
-    if processor.process_document(Path(file_path)):
-        processor.process_compressed_files()
-        return True
-    return False
+    try:
+        if processor.process_document(Path(file_path)):
+            processor.process_compressed_files()
+            processor.excel_handler.flush()
+            return True
+        return False
+    except FatalReviewError:
+        processor.excel_handler.flush()
+        raise
+    finally:
+        processor.flush_results()
+
+# 进程池中每个子进程持有一个识别器，模型只加载一次
+_worker_recognizer = None
+
 
-def batch_review_upload(params=None):
+def _init_recognize_worker(ocr_mode: str, cache_dir, signature_mode: str = "ocr", resolution: str = "fixed",
+                           layout_dir=None):
+    from mymodule.recognize import DocumentRecognizer
+
+    global _worker_recognizer
+    _worker_recognizer = DocumentRecognizer(ocr_mode=ocr_mode, cache_dir=cache_dir, signature_mode=signature_mode,
+                                            resolution=resolution, layout_dir=layout_dir)
+
+
+def _recognize_in_worker(file_path: Path):
+    """在子进程中识别单个文件，返回 (识别结果, 错误信息, 识别耗时, 预分类结果)"""
+    start = time.perf_counter()
+    try:
+        result = _worker_recognizer.identify_document(file_path)
+        return result, None, time.perf_counter() - start, _worker_recognizer.last_prefilter
+    except Exception as e:
+        return None, str(e), time.perf_counter() - start, _worker_recognizer.last_prefilter
+
+
+def _recognized_files(processor, pdf_files, workers, batch_size=1, watchdog=None):
+    """
+    依次产出 (文件, 识别结果, 错误信息, 识别耗时, 预分类结果)
+    传入 watchdog 时在受时间、内存限制的子进程中识别（workers 个进程），超出限制的文件以错误信息返回；
+    workers > 1 时在进程池中并行OCR，产出顺序与输入顺序一致；
+    单进程且 batch_size > 1 时每 batch_size 个文件合并批量推理，识别耗时按批内文件数均摊，批量识别出错的一批逐个识别；
+    否则识别结果、耗时和预分类结果为None，由 process_document 自行识别
+    """
+    if watchdog is not None:
+        outcomes = watchdog.map(pdf_files)
+        try:
+            for pdf_file, outcome in zip(pdf_files, outcomes):
+                yield (pdf_file, *outcome)
+        finally:
+            outcomes.close()  # 提前结束时终止识别进程
+        return
+
+    if workers <= 1:
+        if batch_size > 1:
+            for start in range(0, len(pdf_files), batch_size):
+                chunk = pdf_files[start:start + batch_size]
+                chunk_start = time.perf_counter()
+                try:
+                    outcomes = processor.recognizer.identify_documents(chunk)
+                except Exception as e:
+                    # 批量识别出错时不结束整个批次：本批文件交给 process_document 逐个识别，出错的文件各自记为失败
+                    logging.error(f"批量识别出错，本批 {len(chunk)} 个文件改为逐个识别: {str(e)}")
+                    for pdf_file in chunk:
+                        yield pdf_file, None, None, None, None
+                    continue
+                seconds = (time.perf_counter() - chunk_start) / len(chunk)
+                prefilters = processor.recognizer.last_prefilters
+                for pdf_file, (result, error), prefilter in zip(chunk, outcomes, prefilters):
+                    yield pdf_file, result, error, seconds, prefilter
+            return
+        for pdf_file in pdf_files:
+            yield pdf_file, None, None, None, None
+        return
+
+    # spawn 启动子进程，避免fork带有线程的Flask进程和Paddle运行时
+    executor = ProcessPoolExecutor(max_workers=workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_recognize_worker,
+                                   initargs=(processor.recognizer.ocr_mode, processor.cache_dir,
+                                             processor.recognizer.signature_mode, processor.recognizer.resolution,
+                                             LAYOUT_DIR if processor.recognizer.layout_store is not None else None))
+    try:
+        for pdf_file, outcome in zip(pdf_files, executor.map(_recognize_in_worker, pdf_files)):
+            yield (pdf_file, *outcome)
+    finally:
+        # 提前结束（如任务被取消）时丢弃尚未开始的识别
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def batch_review_upload(params=None, progress_callback=None, cancel_event=None, recognizer=None):
+    """
+    批量审核 uploads 目录下所有pdf文件
+
+    Args:
+        params: 命名参数、ocr_mode、signature_mode、resolution、keep_layouts、compression、placement、workers、batch_size、
+            incremental、resume、timeout、memory_limit_mb、recycle_after 等
+        progress_callback: 可选，progress_callback(已处理数, 总数, 本文件的details条目)，开始时以条目None调用一次
+        cancel_event: 可选，threading.Event，被设置后处理完当前文件即停止
+        recognizer: 可选，复用已加载模型的 DocumentRecognizer
+    """
     from pathlib import Path
 
     if params is None:
@@ -193,22 +533,104 @@ def batch_review_upload(params=None):
             'unit_code': "14655",
             'major_code': "080901"
         }
-    processor = DocumentProcessor(**params)
+    batch_start = time.perf_counter()
+    params = dict(params)
+    workers = int(params.pop('workers', 1))  # OCR进程数，1为单进程顺序处理
+    batch_size = int(params.pop('batch_size', 1))  # 单进程时合并推理的文件数，1为逐个识别
+    incremental = bool(params.pop('incremental', False))  # 只处理新增或修改过的文件
+    resume = bool(params.pop('resume', False))  # 从上次中断的批次继续，已处理的文件不再识别
+    # 单个文件的识别时限（秒）和识别进程内存上限（MB），任一项大于0时在受监控的子进程中识别
+    timeout = float(params.pop('timeout', 0) or 0)
+    memory_limit_mb = float(params.pop('memory_limit_mb', 0) or 0)
+    recycle_after = int(params.pop('recycle_after', 100))  # 每个识别进程识别多少个文件后换新进程，0为不定期回收
+    processor = DocumentProcessor(**params, recognizer=recognizer)
+    watchdog = None
+    if timeout > 0 or memory_limit_mb > 0:
+        if batch_size > 1:
+            logging.info("受监控的子进程中逐个识别，batch_size 不生效")
+        watchdog = RecognitionWatchdog({
+            'ocr_mode': processor.recognizer.ocr_mode,
+            'cache_dir': processor.cache_dir,
+            'signature_mode': processor.recognizer.signature_mode,
+            'resolution': processor.recognizer.resolution,
+            'layout_dir': LAYOUT_DIR if processor.recognizer.layout_store is not None else None
+        }, workers=workers, timeout=timeout, memory_limit_mb=memory_limit_mb, recycle_after=recycle_after)
     upload_dir = processor.input_dir.resolve()
-    pdf_files = list(upload_dir.rglob("*.pdf"))
-    results = []  # 存储每个文件的详细结果
-
+    pdf_files = sorted(upload_dir.rglob("*.pdf"))  # 排序保证 details 顺序稳定
+    rel_paths = []
     for pdf_file in pdf_files:
         # 只保留 uploads 下的相对路径
         try:
-            rel_path = str(pdf_file.relative_to(upload_dir))
+            rel_paths.append(str(pdf_file.relative_to(upload_dir)))
         except Exception:
-            rel_path = pdf_file.name  # fallback
+            rel_paths.append(pdf_file.name)  # fallback
 
-        # 捕获处理中的日志
-        log_msgs = []
+    results = []  # 存储每个文件的详细结果
+    if progress_callback:
+        progress_callback(0, len(pdf_files), None)
+
+    renamer = processor.renamer
+    review_params = {
+        'academic_year': renamer.academic_year,
+        'province_code': renamer.province_code,
+        'unit_code': renamer.unit_code,
+        'major_code': renamer.major_code,
+        'signature_mode': processor.recognizer.signature_mode,
+        'resolution': processor.recognizer.resolution
+    }
+
+    # 审核日志：逐个记录已处理的文件，中断后以 resume 继续时这些文件只恢复副作用，不再识别
+    journal = ReviewJournal(processor.root_dir / ReviewJournal.FILE_NAME, review_params)
+    resumed = {}  # 文件 -> 审核日志条目
+    if resume:
+        entries = journal.pending()
+        for pdf_file, rel_path in zip(pdf_files, rel_paths):
+            entry = journal.lookup(entries, rel_path, pdf_file)
+            if entry is not None:
+                resumed[pdf_file] = entry
+        logging.info(f"继续上次中断的批次: {len(resumed)}/{len(pdf_files)} 个文件已处理")
+    journal.start(resume=bool(resumed))
+
+    # 增量审核：未变化且上次审核通过的文件直接沿用上次的结果，不再识别、重命名和写Excel
+    manifest = None
+    reused = {}  # 文件 -> 清单条目
+    restage_students = set()  # 支撑材料有删除、需要重新压缩的学号
+    if incremental:
+        manifest = ReviewManifest(processor.root_dir / "review_manifest.json", review_params)
+        for entry in manifest.remove_missing(rel_paths):
+            removed_result = entry.get("result") or {}
+            if removed_result.get("type") in ("ktbg", "grade"):
+                restage_students.add(removed_result.get("student_id"))
+        for pdf_file, rel_path in zip(pdf_files, rel_paths):
+            entry = manifest.lookup(rel_path, pdf_file) if pdf_file not in resumed else None
+            if entry is not None:
+                reused[pdf_file] = entry
+        logging.info(f"增量审核: {len(reused)}/{len(pdf_files)} 个文件未变化，沿用上次结果")
+
+    # 流水线：识别（OCR可在进程池中并行）→ 放置（I/O线程池，与下一个文件的识别同时进行）→ 完成。
+    # 完成环节（压缩列表登记、Excel写入、审核明细、审核日志）在主线程中按文件顺序执行
+    recognized = _recognized_files(processor, [f for f in pdf_files if f not in reused and f not in resumed],
+                                   workers, batch_size, watchdog)
+    io_executor = ThreadPoolExecutor(max_workers=processor.io_workers, thread_name_prefix="review-io")
+    inflight = deque()  # (文件, 相对路径, 待完成状态, 识别错误, 识别耗时, 预分类结果)，按文件顺序
+    prefilter_records = []  # (预分类结果, 识别耗时)，统计提前拒绝的文件数和节省的时间
+    stopped = None  # 因严重错误停止时的 {"file", "reason"}
+    cancelled = False
+
+    def finish_next():
+        """按顺序完成最早开始的文件，因严重错误停止时返回False"""
+        nonlocal stopped
+        pdf_file, rel_path, pending, error, recognize_seconds, prefilter = inflight.popleft()
         try:
-            success = processor.process_document(pdf_file)
+            if error is not None:
+                logging.error(f"处理文件时出错 {pdf_file}: {error}")
+                processor.last_result = None
+                processor.last_timings = {}
+                processor.last_effects = {}
+                processor.record_recognition(None, recognize_seconds)
+                success = False
+            else:
+                success = processor.finish_document(pending)
 
             if success:
                 results.append({
@@ -217,11 +639,21 @@ def batch_review_upload(params=None):
                     "message": "审核通过\n" 
                 })
             else:
+                # 被监控进程终止（超时、内存超限、崩溃）的文件给出原因，其他失败与各执行方式一致
+                killed = watchdog is not None and pdf_file in watchdog.killed_files
                 results.append({
                     "file": rel_path,
                     "status": "fail",
-                    "message": "未通过：\n"
+                    "message": f"未通过：{error}\n" if killed else "未通过：\n"
                 })
+        except FatalReviewError as e:
+            # 该文件不记入审核日志，修正Excel或参数后继续时重新处理
+            stopped = {"file": rel_path, "reason": str(e)}
+            results.append({
+                "file": rel_path,
+                "status": "fail",
+                "message": f"严重错误，已停止审核：{str(e)}"
+            })
         except Exception as e:
            
             results.append({
@@ -229,14 +661,171 @@ def batch_review_upload(params=None):
                 "status": "fail",
                 "message": str(e)
             })
-    processor.process_compressed_files()
+        results[-1]["timings"] = rounded_timings(processor.last_timings)  # 本文件各环节耗时（秒）
+        prefilter_records.append((prefilter, processor.last_timings.get("recognize", 0.0)))
+        # 自适应分辨率下本文件各字段的高分辨率重识别次数
+        results[-1]["escalations"] = (processor.last_result or {}).get("escalations", {})
+        review_metrics.observe_file((processor.last_result or {}).get("type"), results[-1]["status"])
+        if progress_callback:
+            progress_callback(len(results), len(pdf_files), results[-1])
+        if stopped is not None:
+            # 之后已识别的文件尚未登记任何结果，直接丢弃
+            inflight.clear()
+            logging.error(f"批量审核已停止，已处理 {len(results) - 1}/{len(pdf_files)} 个文件，"
+                          f"修正后可以 resume 继续")
+            return False
+        detail = {key: value for key, value in results[-1].items() if key not in ("timings", "escalations")}
+        journal.record(rel_path, pdf_file, detail, processor.last_result, processor.last_effects)
+        if manifest is not None:
+            if results[-1]["status"] == "success":
+                manifest.record(rel_path, pdf_file, detail, processor.last_result)
+            else:
+                manifest.forget(rel_path)
+        return True
+
+    def drain():
+        while inflight:
+            if not finish_next():
+                return False
+        return True
+
+    try:
+        for pdf_file, rel_path in zip(pdf_files, rel_paths):
+            if cancel_event is not None and cancel_event.is_set():
+                logging.info(f"批量审核已取消，已处理 {len(results) + len(inflight)}/{len(pdf_files)} 个文件")
+                cancelled = True
+                break
+
+            if pdf_file in resumed or pdf_file in reused:
+                # 沿用的结果不经过流水线，先完成之前的文件以保持顺序
+                if not drain():
+                    break
+
+            if pdf_file in resumed:
+                # 中断前已处理：恢复待压缩列表和Excel更新，沿用当时的审核明细
+                entry = resumed[pdf_file]
+                try:
+                    processor.restore_effects(pdf_file, entry)
+                except FatalReviewError as e:
+                    stopped = {"file": rel_path, "reason": str(e)}
+                    break
+                results.append({**entry["detail"], "timings": {}, "escalations": {}})
+                if manifest is not None:
+                    if entry["detail"]["status"] == "success":
+                        manifest.record(rel_path, pdf_file, entry["detail"], entry.get("result"))
+                    else:
+                        manifest.forget(rel_path)
+                if progress_callback:
+                    progress_callback(len(results), len(pdf_files), results[-1])
+                continue
+
+            if pdf_file in reused:
+                # 沿用上次结果，本次没有处理
+                results.append({**reused[pdf_file]["detail"], "timings": {}, "escalations": {}})
+                if progress_callback:
+                    progress_callback(len(results), len(pdf_files), results[-1])
+                continue
+
+            _, recognition_result, error, recognize_seconds, prefilter = next(recognized)
+            pending = None
+            if error is None:
+                in_process = recognize_seconds is None  # 由 start_document 自行识别
+                pending = processor.start_document(pdf_file, recognition_result, recognize_seconds, io_executor)
+                if in_process:
+                    prefilter = processor.recognizer.last_prefilter
+            inflight.append((pdf_file, rel_path, pending, error, recognize_seconds, prefilter))
+
+            # 放置已完成的文件随即完成；在途文件超过流水线深度时等待最早的文件
+            while inflight and (len(inflight) > processor.PIPELINE_DEPTH
+                                or inflight[0][2] is None or inflight[0][2].ready):
+                if not finish_next():
+                    break
+            if stopped is not None:
+                break
+
+        # 取消时已识别的文件照常完成
+        if stopped is None:
+            drain()
+    finally:
+        recognized.close()  # 提前结束时释放进程池
+        io_executor.shutdown(wait=True)
+
+    if manifest is not None:
+        _restage_support_files(processor, pdf_files, reused, restage_students)
+    try:
+        # 严重错误停止时，已处理学生的支撑材料照常打包，已完成的工作不丢失
+        processor.process_compressed_files()
+    except FatalReviewError as e:
+        stopped = stopped or {"file": None, "reason": str(e)}
+    finally:
+        with processor.batch_timings.stage("excel_save"):
+            processor.excel_handler.flush()  # 整批只保存一次Excel
+        with processor.batch_timings.stage("save_results"):
+            processor.flush_results()  # 整批识别结果一次写入结果库
+        journal.mark_results_saved()
+        # 停止或取消的批次保留审核日志，供 resume 继续
+        if stopped is None and not cancelled:
+            journal.finish()
+        else:
+            journal.close()
+    if manifest is not None:
+        manifest.save()
+    batch_seconds = time.perf_counter() - batch_start
+    review_metrics.observe_batch(batch_seconds)
     return {
         "total": len(pdf_files),
         "success_count": len([r for r in results if r["status"] == "success"]),
         "fail_count": len([r for r in results if r["status"] == "fail"]),
-        "details": results
+        "details": results,
+        # 整批共用环节（压缩包、保存Excel）的耗时和总耗时（秒）
+        "timings": {**rounded_timings(processor.batch_timings.timings), "total": round(batch_seconds, 4)},
+        "prefilter": _prefilter_summary(prefilter_records),
+        # 受监控识别时，因超时、内存超限或崩溃终止的进程数和定期回收次数
+        "watchdog": {"kills": watchdog.kills, "recycles": watchdog.recycles} if watchdog is not None else None,
+        "resumed": len(resumed),  # 从审核日志恢复、未重新处理的文件数
+        "stopped": stopped
+    }
+
+
+def _prefilter_summary(records):
+    """
+    预分类统计：提前拒绝的文件数、预分类耗时，以及估计节省的时间
+    节省的时间按本批未被提前拒绝的文件平均识别耗时估计，减去被拒绝文件的预分类耗时
+    """
+    rejected = [seconds for prefilter, seconds in records if prefilter and prefilter["kind"] == "skip"]
+    recognized = [seconds for prefilter, seconds in records if not (prefilter and prefilter["kind"] == "skip")]
+    methods = {}
+    for prefilter, _ in records:
+        if prefilter and prefilter["kind"] == "skip":
+            methods[prefilter["method"]] = methods.get(prefilter["method"], 0) + 1
+    average = sum(recognized) / len(recognized) if recognized else 0.0
+    saved = max(0.0, average * len(rejected) - sum(rejected))
+    review_metrics.observe_prefilter(methods, saved)
+    return {
+        "checked": len([prefilter for prefilter, _ in records if prefilter]),
+        "rejected": len(rejected),
+        "methods": methods,  # 判断依据（filename/text_layer/low_res）-> 拒绝数
+        "seconds": round(sum(prefilter["seconds"] for prefilter, _ in records if prefilter), 4),
+        "saved_seconds": round(saved, 4)
     }
 
+
+def _restage_support_files(processor, pdf_files, reused, restage_students):
+    """
+    增量审核时，学号下的支撑材料只要有新增、修改或删除，压缩包就要重建，
+    把该学号下未变化的开题报告/成绩考核表也加回待压缩列表，并保持与全量审核相同的文件顺序
+    """
+    students = set(processor.compress_files) | restage_students
+    for pdf_file, entry in reused.items():
+        result = entry.get("result") or {}
+        student_id = result.get("student_id")
+        if result.get("type") in ("ktbg", "grade") and student_id in students:
+            processor.compress_files.setdefault(student_id, []).append((pdf_file, result))
+
+    order = {pdf_file: index for index, pdf_file in enumerate(pdf_files)}
+    for files in processor.compress_files.values():
+        files.sort(key=lambda item: order.get(item[0], len(order)))
+
 def main():
     try:
         params = {
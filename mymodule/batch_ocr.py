@@ -0,0 +1,66 @@
+from typing import List
+
+import cv2
+import numpy as np
+
+
+def sorted_boxes(dt_boxes: List) -> List:
+    """按从上到下、从左到右排序文本框，与PaddleOCR整图识别时的顺序一致"""
+    boxes = sorted(dt_boxes, key=lambda x: (x[0][1], x[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+
+def get_rotate_crop_image(img: np.ndarray, box: List) -> np.ndarray:
+    """按文本框四个角点透视变换裁出文本行图像，与PaddleOCR的裁剪方式一致"""
+    points = np.array(box, dtype=np.float32)
+    crop_width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    crop_height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    pts_std = np.float32([[0, 0], [crop_width, 0], [crop_width, crop_height], [0, crop_height]])
+    matrix = cv2.getPerspectiveTransform(points, pts_std)
+    dst_img = cv2.warpPerspective(img, matrix, (crop_width, crop_height),
+                                  borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if dst_img.shape[0] * 1.0 / max(dst_img.shape[1], 1) >= 1.5:
+        dst_img = np.rot90(dst_img)
+    return dst_img
+
+
+def recognize_images(ocr, images: List[np.ndarray], batch_size: int) -> List[List]:
+    """
+    批量识别多张图像（可来自不同PDF），返回每张图像的 [box, (text, score)] 列表
+
+    图像按 batch_size 分组：组内逐张做文本检测，再把整组所有文本行一起送入识别模型，
+    识别模型按其 rec_batch_num 满批推理，不再受单页文本行数量的限制。
+    """
+    drop_score = getattr(ocr, "drop_score", 0.5)
+    results: List[List] = []
+    for start in range(0, len(images), batch_size):
+        group = images[start:start + batch_size]
+
+        # 检测
+        group_boxes = []
+        for img in group:
+            det_result = ocr.ocr(img, rec=False)
+            boxes = det_result[0] if det_result and det_result[0] else []
+            group_boxes.append(sorted_boxes(boxes))
+
+        # 整组文本行一起识别
+        crops = [get_rotate_crop_image(img, box) for img, boxes in zip(group, group_boxes) for box in boxes]
+        rec_result = ocr.ocr(crops, det=False, cls=False) if crops else [[]]
+        rec_texts = rec_result[0] if rec_result and rec_result[0] else []
+
+        # 按图像拆分回各自的结果
+        offset = 0
+        for boxes in group_boxes:
+            lines = []
+            for box, rec in zip(boxes, rec_texts[offset:offset + len(boxes)]):
+                if rec[1] >= drop_score:
+                    lines.append([box, (rec[0], rec[1])])
+            offset += len(boxes)
+            results.append(lines)
+    return results
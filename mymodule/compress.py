@@ -1,34 +1,68 @@
 from pathlib import Path
+import os
+import zlib
 import zipfile
 import logging
 from datetime import datetime
+from typing import Optional
 
 
 class DocumentCompressor:
-    def __init__(self):
+    # 压缩策略：store 只打包不压缩；deflate 全部压缩；auto 抽样试压，能明显变小的文件才压缩
+    POLICIES = ("store", "deflate", "auto")
+    # auto 策略的抽样大小和判定阈值：样本压缩后不超过原大小的90%才值得压缩
+    SAMPLE_SIZE = 256 * 1024
+    MIN_SAVING = 0.1
+
+    def __init__(self, policy: str = "auto"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的压缩策略: {policy}")
         self.current_time = datetime.utcnow().strftime('%Y%m%d')
+        self.policy = policy
 
-    def compress_files(self, files: list[tuple[Path, dict]], student_id: str, target_dir: Path) -> Path:
+    def _compress_type(self, file_path: Path) -> int:
+        """PDF内部的内容流通常已压缩，再deflate几乎不变小，只白白消耗CPU"""
+        if self.policy == "store":
+            return zipfile.ZIP_STORED
+        if self.policy == "deflate":
+            return zipfile.ZIP_DEFLATED
+        with open(file_path, 'rb') as f:
+            sample = f.read(self.SAMPLE_SIZE)
+        if not sample:
+            return zipfile.ZIP_STORED
+        compressed = zlib.compress(sample, 1)
+        if len(compressed) <= len(sample) * (1 - self.MIN_SAVING):
+            return zipfile.ZIP_DEFLATED
+        return zipfile.ZIP_STORED
 
+    def compress_files(self, files: list[tuple[Path, dict]], student_id: str, target_dir: Path,
+                       zip_name: Optional[str] = None) -> Path:
+        """
+        把学号的支撑材料打包到 target_dir/学号/zip_name，zip_name 为空时使用 <学号>_CL.zip
+        先写临时文件再替换，已有的同名压缩包在新包写完前保持完整
+        """
         try:
             # 确保学号目录存在
             student_dir = target_dir / str(student_id)
             student_dir.mkdir(parents=True, exist_ok=True)
 
             # 创建zip文件
-            zip_name = f"{student_id}_CL.zip"
+            zip_name = zip_name or f"{student_id}_CL.zip"
             zip_path = student_dir / zip_name
+            tmp_path = zip_path.with_name(zip_path.name + '.tmp')
 
-            # 如果zip文件已存在，先删除
-            if zip_path.exists():
-                zip_path.unlink()
-
-            # 压缩文件
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path, _ in files:
-                    # 将文件添加到压缩包，只使用文件名
-                    zipf.write(file_path, file_path.name)
-                    logging.info(f"已添加文件到压缩包: {file_path.name}")
+            try:
+                with zipfile.ZipFile(tmp_path, 'w') as zipf:
+                    for file_path, _ in files:
+                        # 将文件添加到压缩包，只使用文件名
+                        compress_type = self._compress_type(file_path)
+                        zipf.write(file_path, file_path.name, compress_type=compress_type)
+                        logging.info(f"已添加文件到压缩包: {file_path.name}"
+                                     f"{'（压缩）' if compress_type == zipfile.ZIP_DEFLATED else '（仅存储）'}")
+                os.replace(tmp_path, zip_path)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
 
             logging.info(f"创建压缩文件成功: {zip_path}")
             return zip_path
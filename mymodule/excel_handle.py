@@ -1,11 +1,17 @@
 import logging
+import os
 from pathlib import Path
-# import json
+import json
 from typing import Dict, Optional, Tuple
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter, column_index_from_string
 
 
+class TitleMismatchError(Exception):
+    """第一次题目比对不匹配，调用方据此停止整批审核"""
+    pass
+
+
 class ExcelHandler:
     def __init__(self, excel_path: Path):
         """初始化Excel处理器"""
@@ -13,6 +19,7 @@ class ExcelHandler:
 
         self.excel_path = Path(excel_path)
         self.title_checked = False
+        self.dirty = False  # 是否有尚未保存到磁盘的修改
 
         # 定义列映射
         self.COLUMN_MAPPING = {
@@ -33,6 +40,9 @@ class ExcelHandler:
             if column_index_from_string('AA') > max_col:
                 raise ValueError(f"Excel文件列数不足，需要到AA列，当前只有{get_column_letter(max_col)}列")
 
+            # 学号 -> 行号索引，只在加载时扫描一次学号列
+            self.student_rows = self._build_student_index()
+
             logging.info(f"成功加载Excel文件")
 
         except Exception as e:
@@ -50,17 +60,23 @@ class ExcelHandler:
             value = value.name  # 只使用文件名部分
         self.sheet[f"{col}{row}"] = str(value)  # 确保值是字符串
 
+    def _build_student_index(self) -> Dict[str, int]:
+        """建立学号到行号的索引（第1行是标题），学号重复时保留第一次出现的行"""
+        col_idx = column_index_from_string(self.COLUMN_MAPPING['student_id'])
+        index = {}
+        for row, (value,) in enumerate(
+                self.sheet.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx, values_only=True), start=2):
+            current_id = str(value).strip() if value is not None else ""
+            index.setdefault(current_id, row)
+        return index
+
     def _find_student_row(self, student_id: str) -> Optional[int]:
         """在Excel中查找学生所在行"""
         student_id = str(student_id).strip()
-        col = self.COLUMN_MAPPING['student_id']
-
-        # 从第2行开始搜索（第1行是标题）
-        for row in range(2, self.sheet.max_row + 1):
-            current_id = self._get_cell_value(row, col)
-            if current_id == student_id:
-                logging.info(f"找到学生 {student_id} 在第 {row} 行")
-                return row
+        row = self.student_rows.get(student_id)
+        if row is not None:
+            logging.info(f"找到学生 {student_id} 在第 {row} 行")
+            return row
 
         logging.warning(f"未找到学号为 {student_id} 的学生")
         return None
@@ -82,9 +98,16 @@ class ExcelHandler:
 
         return True
 
-    def strict_title_check(self, student_id: str, json_path: Path) -> bool:
+    @staticmethod
+    def _load_title(json_path: Optional[Path], result: Optional[Dict] = None) -> str:
+        """识别结果中的题目：优先使用内存中的识别结果，否则读取JSON文件"""
+        if result is not None:
+            return result.get('title', '')
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('title', '')
+
+    def strict_title_check(self, student_id: str, json_path: Optional[Path], result: Optional[Dict] = None) -> bool:
 
-        global json
         if self.title_checked:
             # 如果不是第一次比对，只返回比对结果
             row = self._find_student_row(student_id)
@@ -92,10 +115,7 @@ class ExcelHandler:
                 return False
 
             try:
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    import json
-                    json_data = json.load(f)
-                    json_title = json_data.get('title', '')
+                json_title = self._load_title(json_path, result)
                 return self._compare_titles(row, json_title)
             except Exception as e:
                 logging.error(f"读取JSON文件失败: {str(e)}")
@@ -107,13 +127,10 @@ class ExcelHandler:
                 raise ValueError(f"未找到学号为 {student_id} 的学生")
 
             try:
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    import json
-                    json_data = json.load(f)
-                    json_title = json_data.get('title', '')
+                json_title = self._load_title(json_path, result)
 
                 if not self._compare_titles(row, json_title):
-                    raise ValueError(
+                    raise TitleMismatchError(
                         f"学号 {student_id} 的论文题目不匹配\n"
                         f"Excel中的题目: {self._get_cell_value(row, self.COLUMN_MAPPING['thesis_title'])}\n"
                         f"JSON中的题目: {json_title}"
@@ -123,12 +140,16 @@ class ExcelHandler:
                 self.title_checked = True
                 return True
 
+            except TitleMismatchError:
+                raise
             except json.JSONDecodeError as e:
                 raise ValueError(f"JSON文件格式错误: {str(e)}")
             except Exception as e:
                 raise ValueError(f"读取识别结果失败: {str(e)}")
 
-    def process_student(self, student_id: str, file_names: Dict[str, str], json_path: Path = None) -> Tuple[bool, str]:
+    def process_student(self, student_id: str, file_names: Dict[str, str], json_path: Path = None,
+                        result: Optional[Dict] = None) -> Tuple[bool, str]:
+        """更新学生的文件名列；论文和支撑材料先比对题目，题目取自 result（识别结果）或 json_path"""
 
         # 处理单个学生的所有文件
         try:
@@ -140,13 +161,9 @@ class ExcelHandler:
                 return False, f"未找到学号为 {student_id} 的学生"
 
             # 如果是论文或支撑材料，需要进行题目比对
-            if ('thesis' in file_names or 'ktbg' in file_names) and json_path is not None:
-                try:
-                    if not self.strict_title_check(student_id, json_path):
-                        return False, f"学号 {student_id} 的论文题目不匹配"
-                except ValueError as e:
-                    # 第一次比对失败，直接抛出异常终止程序
-                    raise
+            if ('thesis' in file_names or 'ktbg' in file_names) and (json_path is not None or result is not None):
+                if not self.strict_title_check(student_id, json_path, result):
+                    return False, f"学号 {student_id} 的论文题目不匹配"
 
             # 更新文件名
             type_to_column = {
@@ -164,17 +181,34 @@ class ExcelHandler:
                     self._set_cell_value(row, col, file_name)
                     messages.append(f"{file_type}文件已更新")
 
-            # 保存Excel
-            self.workbook.save(str(self.excel_path))
-            messages.append("Excel文件已保存")
+            # 修改先保留在内存中，批量处理结束或调用 flush 时统一保存
+            self.dirty = True
 
             return True, "; ".join(messages)
 
+        except TitleMismatchError:
+            # 第一次题目比对不匹配由调用方停止审核，不能当作普通的更新失败；其他错误只记为本次更新失败
+            raise
         except Exception as e:
             error_msg = f"处理学生 {student_id} 的文件时出错: {str(e)}"
             logging.error(error_msg)
             return False, error_msg
 
+    def flush(self) -> None:
+        """将内存中的修改一次性写回Excel；先写临时文件再替换，避免中途失败损坏原文件"""
+        if not self.dirty:
+            return
+
+        tmp_path = self.excel_path.with_name(f"{self.excel_path.stem}.tmp{self.excel_path.suffix}")
+        try:
+            self.workbook.save(str(tmp_path))
+            os.replace(tmp_path, self.excel_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        self.dirty = False
+        logging.info(f"Excel文件已保存: {self.excel_path}")
+
     def __del__(self):
         """析构函数，确保工作簿被关闭"""
         try:
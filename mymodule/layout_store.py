@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from mymodule.ocr_cache import OcrResultCache
+from mymodule.page_layout import PageLayout
+
+
+class LayoutStore:
+    """
+    保存每个文件识别时的原始版面（文本框、文字、置信度），供修改区域坐标、跳过关键词、正则等规则后离线回放
+
+    目录结构: <root_dir>/<内容哈希>.npz，每个文件一个压缩的NumPy归档：
+    - meta: JSON，原文件路径、识别参数、识别结果或错误信息、各版面的键
+    - l<序号>_boxes / l<序号>_texts / l<序号>_scores: 各版面的数组，坐标为区域常量所用的基准坐标
+
+    版面的键与页面来源一致：("ocr", 页码)、("text", 页码)、("low_res", 0)、("refine", 页码, 矩形, 倍率)。
+    """
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    def save(self, file_path: Path, layouts: Dict[tuple, PageLayout], settings: Dict[str, Any],
+             result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> Path:
+        """保存一个文件的版面，同一内容的文件再次识别时覆盖"""
+        file_path = Path(file_path)
+        arrays = {}
+        keys = []
+        for index, (key, layout) in enumerate(layouts.items()):
+            name = f"l{index}"
+            arrays[f"{name}_boxes"] = layout.boxes  # 保留float64，回放时区域边界的判断与识别时完全一致
+            arrays[f"{name}_texts"] = np.array(layout.texts, dtype=np.str_)
+            arrays[f"{name}_scores"] = np.asarray(layout.scores, dtype=np.float32)
+            # 键中的矩形（元组）在JSON中存为列表
+            keys.append([name, [list(part) if isinstance(part, tuple) else part for part in key]])
+        meta = {
+            "file": str(file_path.resolve()),
+            "name": file_path.name,
+            "saved_at": datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            "settings": settings,
+            "result": result,
+            "error": error,
+            "layouts": keys,
+        }
+        arrays["meta"] = np.array(json.dumps(meta, ensure_ascii=False))
+
+        path = self.root_dir / f"{OcrResultCache.file_hash(file_path)}.npz"
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return path
+
+    @staticmethod
+    def load(path: Path) -> Tuple[Dict[str, Any], Dict[tuple, PageLayout]]:
+        """读取一个归档，返回 (meta, 版面)"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            layouts = {}
+            for name, key in meta["layouts"]:
+                key = tuple(tuple(part) if isinstance(part, list) else part for part in key)
+                layouts[key] = PageLayout(data[f"{name}_boxes"],
+                                          [str(text) for text in data[f"{name}_texts"]],
+                                          data[f"{name}_scores"])
+        return meta, layouts
+
+    def __iter__(self) -> Iterator[Path]:
+        return iter(sorted(self.root_dir.glob("*.npz")))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.root_dir.glob("*.npz"))
+
+
+def _comparable(result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """比较时忽略重识别次数"""
+    if result is None:
+        return None
+    return {key: value for key, value in result.items() if key != "escalations"}
+
+
+def replay(store: LayoutStore, signature_mode: Optional[str] = None,
+           resolution: Optional[str] = None) -> Dict[str, Any]:
+    """
+    用当前代码中的规则回放全部保存的版面，不做模型推理，返回与保存时结果不同的文件列表
+    signature_mode、resolution 为None时沿用保存时的设置
+    """
+    from mymodule.recognize import DocumentRecognizer
+
+    start = time.perf_counter()
+    recognizers: Dict[Tuple[str, str], DocumentRecognizer] = {}
+    changed = []
+    total = 0
+    for path in store:
+        try:
+            meta, layouts = store.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"跳过无法读取的版面 {path}: {str(e)}")
+            continue
+        total += 1
+        settings = meta.get("settings", {})
+        key = (signature_mode or settings.get("signature_mode", "ocr"),
+               resolution or settings.get("resolution", "fixed"))
+        if key not in recognizers:
+            recognizers[key] = DocumentRecognizer(cache_dir=None, signature_mode=key[0], resolution=key[1])
+        try:
+            result, error = recognizers[key].replay(Path(meta["file"]), layouts), None
+        except Exception as e:
+            result, error = None, str(e)
+
+        before = (_comparable(meta.get("result")), meta.get("error"))
+        after = (_comparable(result), error)
+        if before != after:
+            changed.append({"file": meta["file"], "before": before, "after": after})
+    return {"total": total, "changed": changed, "seconds": time.perf_counter() - start}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="用保存的OCR版面离线回放识别规则，不加载模型")
+    parser.add_argument("--dir", type=Path, default=Path("ocr_layouts"))
+    parser.add_argument("--signature-mode", choices=["ocr", "ink"], help="默认沿用保存时的设置")
+    parser.add_argument("--resolution", choices=["fixed", "adaptive"], help="默认沿用保存时的设置")
+    args = parser.parse_args()
+
+    summary = replay(LayoutStore(args.dir), args.signature_mode, args.resolution)
+    for change in summary["changed"]:
+        print(f"{change['file']}\n  之前: {change['before']}\n  现在: {change['after']}")
+    print(f"回放 {summary['total']} 个文件，结果变化 {len(summary['changed'])} 个，耗时 {summary['seconds']:.2f}s")
+    return 1 if summary["changed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
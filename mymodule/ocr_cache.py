@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class OcrResultCache:
+    """
+    按文件内容哈希缓存识别结果，避免重复审核时对同一PDF再次OCR
+
+    目录结构: <cache_dir>/<配置指纹>/<缓存键>.json，缓存键为内容哈希（文件名决定分类时由识别器附加分类的摘要）
+    识别器配置（模型、检测阈值、区域坐标等）变化后指纹随之变化。不同配置的识别器（如识别器池中的各种模式）
+    共用同一缓存目录，打开缓存时不删除其他指纹目录；长期未使用的指纹目录用 prune 清理：
+        python -m mymodule.ocr_cache --dir ocr_cache --max-age-days 30
+    """
+
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir: Path, fingerprint: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.entry_dir = self.cache_dir / fingerprint
+        self.entry_dir.mkdir(parents=True, exist_ok=True)
+        self._size = sum(p.stat().st_size for p in self.entry_dir.glob("*.json"))
+
+    @staticmethod
+    def file_hash(file_path: Path) -> str:
+        """计算文件内容的sha256"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, content_hash: str) -> Path:
+        return self.entry_dir / f"{content_hash}.json"
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存条目，未命中返回None
+        条目格式: {"result": 识别结果} 或 {"error": 不合格结论的错误信息, "rejected": True}
+        """
+        entry_path = self._entry_path(content_hash)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(entry_path)  # 更新访问时间，淘汰时按最久未使用
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, content_hash: str, entry: Dict[str, Any]) -> None:
+        entry_path = self._entry_path(content_hash)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            old_size = entry_path.stat().st_size
+        except OSError:
+            old_size = 0
+        try:
+            # 目录可能已被 prune 清理，重新创建
+            self.entry_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            # 原子替换，多个进程同时写入同一条目时不会读到半个文件
+            os.replace(tmp_path, entry_path)
+            # 覆盖已有条目时只计入大小的变化
+            self._size += entry_path.stat().st_size - old_size
+        except OSError as e:
+            logging.warning(f"写入OCR缓存失败: {str(e)}")
+            return
+
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        """按最久未使用淘汰条目，直到总大小降到上限的80%以下"""
+        entries = []
+        for path in self.entry_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        self._size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.8
+        for _, size, path in sorted(entries):
+            if self._size <= target:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+        logging.info(f"OCR缓存淘汰完成，当前大小: {self._size} 字节")
+
+    @staticmethod
+    def prune(cache_dir: Path, max_age_days: float, keep: Optional[str] = None) -> List[Path]:
+        """
+        删除最近 max_age_days 天内没有读写过的配置指纹目录（keep 指定的指纹除外），返回删除的目录
+        读取条目时会更新其修改时间，仍在使用的配置不会被删除
+        """
+        cache_dir = Path(cache_dir)
+        if not cache_dir.is_dir():
+            return []
+        cutoff = time.time() - max_age_days * 86400
+        removed = []
+        for path in cache_dir.iterdir():
+            if not path.is_dir() or path.name == keep:
+                continue
+            try:
+                last_used = max((entry.stat().st_mtime for entry in path.glob("*.json")),
+                                default=path.stat().st_mtime)
+            except OSError:
+                continue
+            if last_used < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(path)
+                logging.info(f"清除长期未使用的OCR缓存: {path}")
+        return removed
+
+    def clear(self) -> None:
+        """清空当前配置下的全部缓存"""
+        for path in self.entry_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+        self._size = 0
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="清理长期未使用的识别配置的OCR缓存")
+    parser.add_argument("--dir", type=Path, default=Path("ocr_cache"))
+    parser.add_argument("--max-age-days", type=float, default=30, help="多少天内没有读写过的配置指纹目录被删除")
+    args = parser.parse_args()
+
+    removed = OcrResultCache.prune(args.dir, args.max_age_days)
+    for path in removed:
+        print(f"已删除: {path}")
+    print(f"清理 {len(removed)} 个配置指纹目录")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
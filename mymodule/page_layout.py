@@ -0,0 +1,65 @@
+from typing import List, Sequence
+
+import numpy as np
+
+
+class PageLayout:
+    """
+    一页识别结果的数组形式：文本框坐标存为 (N, 4, 2) 的NumPy数组，文字和置信度为并行列表
+
+    由 [box, (text, score)] 列表转换一次，之后的区域查询都在数组上向量化完成，
+    一次调用即可回答多个区域，不必每个区域都遍历一遍识别结果。
+    """
+
+    __slots__ = ("boxes", "texts", "scores")
+
+    def __init__(self, boxes: np.ndarray, texts: List[str], scores: np.ndarray):
+        self.boxes = boxes
+        self.texts = texts
+        self.scores = scores
+
+    @classmethod
+    def from_lines(cls, lines) -> "PageLayout":
+        """由OCR或文本层的 [box, (text, score)] 列表构建；已是 PageLayout 时原样返回"""
+        if isinstance(lines, PageLayout):
+            return lines
+        lines = lines or []
+        boxes = np.array([line[0] for line in lines], dtype=np.float64).reshape(-1, 4, 2)
+        texts = [line[1][0] for line in lines]
+        scores = np.array([line[1][1] for line in lines], dtype=np.float32)
+        return cls(boxes, texts, scores)
+
+    def to_lines(self) -> List:
+        """转换回 [box, (text, score)] 列表"""
+        return [[box.tolist(), (text, float(score))]
+                for box, text, score in zip(self.boxes, self.texts, self.scores)]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @staticmethod
+    def region_bounds(regions: Sequence[List[List[float]]]) -> np.ndarray:
+        """多个区域的四个角点 -> (R, 4) 的 [x0, y0, x1, y1] 数组"""
+        corners = np.asarray(regions, dtype=np.float64).reshape(len(regions), -1, 2)
+        return np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+
+    def region_masks(self, regions: Sequence[List[List[float]]]) -> np.ndarray:
+        """
+        各区域包含哪些文本行，返回 (R, N) 布尔数组
+        与原先逐行判断一致：用文本框第一个点（左上角）判断是否落在区域内（含边界）
+        """
+        if not regions:
+            return np.zeros((0, len(self)), dtype=bool)
+        bounds = self.region_bounds(regions)[:, None, :]  # (R, 1, 4)
+        anchors = self.boxes[:, 0, :][None, :, :]  # (1, N, 2)
+        return ((anchors[..., 0] >= bounds[..., 0]) & (anchors[..., 0] <= bounds[..., 2]) &
+                (anchors[..., 1] >= bounds[..., 1]) & (anchors[..., 1] <= bounds[..., 3]))
+
+    def region_texts(self, regions: Sequence[List[List[float]]]) -> List[str]:
+        """一次查询多个区域，返回每个区域内文本按识别顺序以空格拼接的结果"""
+        texts = self.texts
+        return [" ".join(texts[i] for i in np.flatnonzero(mask)) for mask in self.region_masks(regions)]
+
+    def region_min_scores(self, regions: Sequence[List[List[float]]]) -> List[float]:
+        """每个区域内文本行的最低置信度，区域内没有文本时为0"""
+        return [float(self.scores[mask].min()) if mask.any() else 0.0 for mask in self.region_masks(regions)]
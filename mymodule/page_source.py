@@ -0,0 +1,347 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from mymodule.page_layout import PageLayout
+from mymodule.pdf_pages import PdfPages
+
+Bounds = Tuple[float, float, float, float]
+
+
+def region_bounds(region: List[List[float]]) -> Bounds:
+    """区域四个角点 -> (x0, y0, x1, y1)"""
+    x_coords = [p[0] for p in region]
+    y_coords = [p[1] for p in region]
+    return min(x_coords), min(y_coords), max(x_coords), max(y_coords)
+
+
+def union_bounds(regions: List[List[List[float]]]) -> Bounds:
+    """多个区域合并成一个外接矩形"""
+    all_bounds = [region_bounds(region) for region in regions]
+    return (min(b[0] for b in all_bounds), min(b[1] for b in all_bounds),
+            max(b[2] for b in all_bounds), max(b[3] for b in all_bounds))
+
+
+def _overlaps(a: Bounds, b: Bounds) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _contains(outer: Bounds, inner: Bounds) -> bool:
+    return (outer[0] <= inner[0] and outer[1] <= inner[1] and
+            outer[2] >= inner[2] and outer[3] >= inner[3])
+
+
+def merge_bounds(bounds_list: List[Bounds]) -> List[Bounds]:
+    """合并相互重叠的矩形，保证每个区域只落在一个合并后的矩形内"""
+    merged: List[Bounds] = []
+    for bounds in bounds_list:
+        current = bounds
+        changed = True
+        while changed:
+            changed = False
+            for other in merged:
+                if _overlaps(current, other):
+                    merged.remove(other)
+                    current = (min(current[0], other[0]), min(current[1], other[1]),
+                               max(current[2], other[2]), max(current[3], other[3]))
+                    changed = True
+                    break
+        merged.append(current)
+    return merged
+
+
+def _in_bounds(point: List[float], bounds: Bounds) -> bool:
+    x, y = point
+    return bounds[0] <= x <= bounds[2] and bounds[1] <= y <= bounds[3]
+
+
+def _ocr_lines(ocr, img) -> List:
+    """识别单张图像，返回 [box, (text, score)] 列表"""
+    result = ocr.ocr(img)
+    if not result or not result[0]:
+        return []
+    return result[0]
+
+
+class OcrPending(Exception):
+    """延迟模式下需要识别一张尚未识别的图像，由批量识别统一处理后通过 prefill 回填"""
+
+    def __init__(self, source, key, image):
+        super().__init__(f"等待识别: {key}")
+        self.source = source
+        self.key = key
+        self.image = image
+
+
+class _OcrSource:
+    """
+    OCR来源基类：deferred 为True时不直接识别，而是抛出 OcrPending 交给批量识别
+
+    render_factor 为渲染倍率（相对基准分辨率），小于1时为粗识别，识别结果的坐标换算回基准坐标；
+    粗识别提取失败的区域可用 refine 以更高倍率重新渲染识别，escalations 记录各字段的重识别次数。
+    """
+
+    def __init__(self, ocr, render_factor: float = 1.0):
+        self.ocr = ocr
+        self.render_factor = render_factor
+        self.deferred = False
+        self.escalations: Dict[str, int] = {}
+        self._prefilled: Dict[Any, List] = {}
+        self._refined: Dict[Any, PageLayout] = {}
+
+    def prefill(self, key, lines: List) -> None:
+        """回填批量识别得到的结果（图像坐标系下的 [box, (text, score)] 列表）"""
+        self._prefilled[key] = lines
+
+    def _ocr_image(self, key, img) -> List:
+        if key in self._prefilled:
+            return self._prefilled.pop(key)
+        if self.deferred:
+            raise OcrPending(self, key, img)
+        return _ocr_lines(self.ocr, img)
+
+    def refine(self, page_index: int, regions: Optional[List[List[List[float]]]], factor: float,
+               field: str, margin: float = 0.0) -> Optional[PageLayout]:
+        """
+        以基准分辨率的 factor 倍重新渲染并识别 regions 合并后的矩形（为None时整页），返回基准坐标的 PageLayout
+        同一区域只重识别一次，field 为触发重识别的字段，计入 escalations
+        """
+        if page_index >= min(self.pages.page_count, self.max_pages):
+            return None
+        bounds = union_bounds(regions) if regions is not None else None
+        key = ("refine", page_index, bounds, factor)
+        if key in self._refined:
+            return self._refined[key]
+
+        if bounds is None:
+            img, (x0, y0) = self.pages.render(page_index, factor), (0, 0)
+        else:
+            img, (x0, y0) = self.pages.render_clip(page_index, [bounds[0] - margin, bounds[1] - margin,
+                                                                bounds[2] + margin, bounds[3] + margin], factor)
+        lines = []
+        for box, rec in (self._ocr_image(key, img) if img.size > 0 else []):
+            page_box = [[(float(x) + x0) / factor, (float(y) + y0) / factor] for x, y in box]
+            if bounds is None or _in_bounds(page_box[0], bounds):
+                lines.append([page_box, rec])
+        self._refined[key] = PageLayout.from_lines(lines)
+        self.escalations[field] = self.escalations.get(field, 0) + 1
+        return self._refined[key]
+
+    def _page_layouts(self) -> Dict[int, PageLayout]:
+        raise NotImplementedError
+
+    def layouts(self) -> Dict[tuple, PageLayout]:
+        """
+        已识别的版面（基准坐标），供保存后离线回放：
+        ("ocr", 页码) 为该页的识别行，("refine", 页码, 矩形, 倍率) 为高分辨率重识别的结果
+        """
+        layouts = {("ocr", page_index): layout for page_index, layout in self._page_layouts().items()}
+        layouts.update(self._refined)
+        return layouts
+
+
+def _scale_lines(lines: List, factor: float) -> List:
+    """factor 倍渲染图像上的识别行 -> 基准坐标"""
+    if factor == 1.0:
+        return lines
+    return [[[[float(x) / factor, float(y) / factor] for x, y in box], rec] for box, rec in lines]
+
+
+class FullPageSource(_OcrSource):
+    """整页OCR：按页渲染并识别，只有实际用到的页才会被识别，按区域取结果时返回整页结果
+
+    page 返回 PageLayout，每页识别结果只转换一次。
+    """
+
+    def __init__(self, ocr, file_path: Path, max_pages: int, render_factor: float = 1.0):
+        super().__init__(ocr, render_factor)
+        self.file_path = Path(file_path)
+        self.max_pages = max_pages
+        self.pages = PdfPages(self.file_path)
+        self._results: Dict[int, PageLayout] = {}
+
+    @property
+    def recognized_pages(self) -> int:
+        """已执行OCR的页数"""
+        return len(self._results)
+
+    def has_pages(self) -> bool:
+        return bool(self.page(0))
+
+    def page(self, page_index: int, regions: Optional[List[List[List[float]]]] = None) -> PageLayout:
+        if page_index >= min(self.pages.page_count, self.max_pages):
+            return PageLayout.from_lines([])
+        if page_index not in self._results:
+            img = self.pages.render(page_index, self.render_factor)
+            self._results[page_index] = PageLayout.from_lines(
+                _scale_lines(self._ocr_image(page_index, img), self.render_factor))
+        return self._results[page_index]
+
+    def _page_layouts(self) -> Dict[int, PageLayout]:
+        return dict(self._results)
+
+    def close(self):
+        self.pages.close()
+
+
+class RegionSource(_OcrSource):
+    """区域OCR：每页只渲染一次，只对所需区域裁剪后做检测和识别
+
+    识别结果的坐标会平移回整页坐标系，因此可以直接交给 extract_text_from_region 使用。
+    page 返回所需区域的识别行合并成的 PageLayout。
+    """
+
+    def __init__(self, ocr, file_path: Path, max_pages: int, margin: float = 0.0, render_factor: float = 1.0):
+        super().__init__(ocr, render_factor)
+        self.file_path = Path(file_path)
+        self.max_pages = max_pages
+        self.margin = margin
+        self.pages = PdfPages(self.file_path)
+        # 页码 -> [(已识别的矩形, 落在该矩形内的识别行)]
+        self._crops: Dict[int, List[Tuple[Bounds, List]]] = {}
+
+    @property
+    def recognized_pages(self) -> int:
+        """已执行OCR（至少识别过一个区域）的页数"""
+        return len(self._crops)
+
+    def has_pages(self) -> bool:
+        return self.pages.page_count > 0
+
+    def seed(self, page_index: int, bounds: Bounds, layout: PageLayout) -> None:
+        """登记已在别处以相同倍率识别过的矩形（如预分类识别的标题区域），落在其中的区域不再识别"""
+        self._crops.setdefault(page_index, []).append((bounds, layout.to_lines()))
+
+    def _recognize_bounds(self, page_index: int, bounds: Bounds) -> List:
+        for done_bounds, lines in self._crops.get(page_index, []):
+            if _contains(done_bounds, bounds):
+                return [line for line in lines if _in_bounds(line[0][0], bounds)]
+
+        factor = self.render_factor
+        img = self.pages.render(page_index, factor)
+        crop_img, (x0, y0) = PdfPages.crop(img, [(bounds[0] - self.margin) * factor,
+                                                 (bounds[1] - self.margin) * factor,
+                                                 (bounds[2] + self.margin) * factor,
+                                                 (bounds[3] + self.margin) * factor])
+        lines = []
+        if crop_img.size > 0:
+            for box, rec in self._ocr_image((page_index, bounds), crop_img):
+                page_box = [[(float(x) + x0) / factor, (float(y) + y0) / factor] for x, y in box]
+                # 外扩边距只用于避免切断文本行，结果仍按左上角是否落在区域内过滤
+                if _in_bounds(page_box[0], bounds):
+                    lines.append([page_box, rec])
+        self._crops.setdefault(page_index, []).append((bounds, lines))
+        return lines
+
+    def page(self, page_index: int, regions: Optional[List[List[List[float]]]] = None) -> PageLayout:
+        if page_index >= min(self.pages.page_count, self.max_pages):
+            return PageLayout.from_lines([])
+        if regions is None:
+            img = self.pages.render(page_index, self.render_factor)
+            height, width = img.shape[:2]
+            return PageLayout.from_lines(self._recognize_bounds(
+                page_index, (0.0, 0.0, width / self.render_factor, height / self.render_factor)))
+
+        lines = []
+        for bounds in merge_bounds([region_bounds(region) for region in regions]):
+            lines.extend(self._recognize_bounds(page_index, bounds))
+        return PageLayout.from_lines(lines)
+
+    def _page_layouts(self) -> Dict[int, PageLayout]:
+        """每页已识别区域的识别行合并为一个版面，只覆盖识别过的区域"""
+        return {page_index: PageLayout.from_lines([line for _, lines in crops for line in lines])
+                for page_index, crops in self._crops.items()}
+
+    def close(self):
+        self.pages.close()
+
+
+class TextLayerSource:
+    """
+    PDF文本层：直接读取带坐标的文字，不做OCR；扫描件等没有文本层的页面返回空结果
+    指定 fallback 和 ocr_pages 时，这些页改由 fallback（OCR来源）识别
+    """
+
+    def __init__(self, file_path: Path, max_pages: int, fallback=None, ocr_pages=()):
+        self.file_path = Path(file_path)
+        self.max_pages = max_pages
+        self.fallback = fallback
+        self.ocr_pages = set(ocr_pages) if fallback is not None else set()
+        self.pages = PdfPages(self.file_path)
+        self.accessed_pages = set()  # 识别过程中读取过的页
+        self._layouts: Dict[int, PageLayout] = {}
+
+    @property
+    def recognized_pages(self) -> int:
+        return self.fallback.recognized_pages if self.fallback is not None else 0
+
+    @property
+    def escalations(self) -> Dict[str, int]:
+        return self.fallback.escalations if self.fallback is not None else {}
+
+    def refine(self, page_index: int, regions: Optional[List[List[List[float]]]], factor: float,
+               field: str, margin: float = 0.0) -> Optional[PageLayout]:
+        """文本层的页面无需提高分辨率，只有改由OCR识别的页才重识别"""
+        if page_index in self.ocr_pages:
+            return self.fallback.refine(page_index, regions, factor, field, margin)
+        return None
+
+    def has_pages(self) -> bool:
+        return self.pages.page_count > 0
+
+    def page(self, page_index: int, regions: Optional[List[List[List[float]]]] = None) -> PageLayout:
+        if page_index >= min(self.pages.page_count, self.max_pages):
+            return PageLayout.from_lines([])
+        self.accessed_pages.add(page_index)
+        if page_index in self.ocr_pages:
+            return self.fallback.page(page_index, regions)
+        if page_index not in self._layouts:
+            self._layouts[page_index] = PageLayout.from_lines(self.pages.text_lines(page_index))
+        return self._layouts[page_index]
+
+    def layouts(self) -> Dict[tuple, PageLayout]:
+        """读取过的文本层版面为 ("text", 页码)，改由OCR识别的页见 fallback"""
+        layouts = {("text", page_index): layout for page_index, layout in self._layouts.items()}
+        if self.fallback is not None:
+            layouts.update(self.fallback.layouts())
+        return layouts
+
+    def close(self):
+        self.pages.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+class ReplaySource:
+    """
+    离线回放：用保存的版面代替渲染和OCR，不加载模型
+    某页同时有OCR版面和文本层版面时使用OCR版面（与原识别时最终采用的来源一致）；
+    refine 只能返回原识别时保存的同一区域、同一倍率的重识别结果，没有时返回None
+    """
+
+    def __init__(self, layouts: Dict[tuple, PageLayout]):
+        self._layouts = layouts
+        self.escalations: Dict[str, int] = {}
+        self.recognized_pages = 0
+
+    def has_pages(self) -> bool:
+        return any(key[0] in ("ocr", "text") for key in self._layouts)
+
+    def page(self, page_index: int, regions: Optional[List[List[List[float]]]] = None) -> PageLayout:
+        for kind in ("ocr", "text"):
+            if (kind, page_index) in self._layouts:
+                return self._layouts[(kind, page_index)]
+        return PageLayout.from_lines([])
+
+    def refine(self, page_index: int, regions: Optional[List[List[List[float]]]], factor: float,
+               field: str, margin: float = 0.0) -> Optional[PageLayout]:
+        bounds = union_bounds(regions) if regions is not None else None
+        layout = self._layouts.get(("refine", page_index, bounds, factor))
+        if layout is not None:
+            self.escalations[field] = self.escalations.get(field, 0) + 1
+        return layout
+
+    def layouts(self) -> Dict[tuple, PageLayout]:
+        return {}
+
+    def close(self):
+        pass
@@ -0,0 +1,105 @@
+from pathlib import Path
+from typing import Dict, List, Tuple
+import fitz
+import numpy as np
+import cv2
+
+
+class PdfPages:
+    """按需渲染PDF页面，渲染参数与PaddleOCR读取PDF时保持一致，保证区域坐标通用"""
+
+    # PaddleOCR读取PDF时默认放大2倍，超过该尺寸则按原始大小渲染
+    ZOOM = 2
+    MAX_SIDE = 2000
+
+    def __init__(self, pdf_path: Path):
+        self.pdf_path = Path(pdf_path)
+        self.doc = fitz.open(str(self.pdf_path))
+        self._images: Dict[Tuple[int, float], np.ndarray] = {}
+
+    @property
+    def page_count(self) -> int:
+        return self.doc.page_count
+
+    def render(self, page_index: int, factor: float = 1.0) -> np.ndarray:
+        """
+        渲染指定页为BGR图像，同一页（同一倍率）只渲染一次
+        factor 为相对基准分辨率的倍率，图像像素坐标除以 factor 即为区域常量所用的基准坐标
+        """
+        key = (page_index, factor)
+        if key not in self._images:
+            page = self.doc[page_index]
+            # 与PaddleOCR一致：宽或高超过2000像素时不放大
+            zoom = self.scale(page_index) * factor
+            pm = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            self._images[key] = self._to_bgr(pm)
+        return self._images[key]
+
+    def render_clip(self, page_index: int, bounds: List[float], factor: float) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        只渲染页面上 [x0, y0, x1, y1]（基准坐标）的区域，分辨率为基准的 factor 倍
+        返回图像和其左上角在 factor 倍坐标系中的位置，与 crop 的返回值含义一致
+        """
+        page = self.doc[page_index]
+        scale = self.scale(page_index)
+        clip = fitz.Rect(*[value / scale for value in bounds]) & page.rect
+        zoom = scale * factor
+        pm = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+        return self._to_bgr(pm), (pm.x, pm.y)
+
+    @staticmethod
+    def _to_bgr(pm: fitz.Pixmap) -> np.ndarray:
+        img = np.frombuffer(pm.samples, dtype=np.uint8).reshape(pm.height, pm.width, pm.n)
+        return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+
+    def scale(self, page_index: int) -> float:
+        """页面坐标（pt）到渲染图像像素的缩放比例，与 render 的放大规则一致"""
+        return self.page_scale(self.doc[page_index].rect)
+
+    @classmethod
+    def page_scale(cls, rect: fitz.Rect) -> float:
+        """按页面尺寸计算渲染缩放比例，不需要打开 PdfPages 也可使用"""
+        if rect.width * cls.ZOOM > cls.MAX_SIDE or rect.height * cls.ZOOM > cls.MAX_SIDE:
+            return 1.0
+        return float(cls.ZOOM)
+
+    def text_lines(self, page_index: int) -> List:
+        """
+        读取页面文本层，按行返回与OCR结果相同格式的 [box, (text, score)] 列表，坐标换算到渲染图像像素
+        扫描件等没有文本层的页面返回空列表
+        """
+        page = self.doc[page_index]
+        scale = self.scale(page_index)
+        lines = []
+        for block in page.get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                text = "".join(span["text"] for span in line["spans"]).strip()
+                if not text:
+                    continue
+                rect = fitz.Rect(line["bbox"]) * page.rotation_matrix * scale
+                box = [[rect.x0, rect.y0], [rect.x1, rect.y0], [rect.x1, rect.y1], [rect.x0, rect.y1]]
+                lines.append([box, (text, 1.0)])
+        # 与OCR结果一致按从上到下、从左到右排序
+        lines.sort(key=lambda item: (item[0][0][1], item[0][0][0]))
+        return lines
+
+    @staticmethod
+    def crop(img: np.ndarray, bounds: List[float]) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """按 [x0, y0, x1, y1] 裁剪图像，坐标自动截断到图像范围内，返回裁剪图和其左上角坐标"""
+        height, width = img.shape[:2]
+        x0, y0, x1, y1 = bounds
+        x0 = max(0, min(int(x0), width))
+        y0 = max(0, min(int(y0), height))
+        x1 = max(0, min(int(x1), width))
+        y1 = max(0, min(int(y1), height))
+        return np.ascontiguousarray(img[y0:y1, x0:x1]), (x0, y0)
+
+    def close(self):
+        self._images.clear()
+        self.doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
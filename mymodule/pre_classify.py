@@ -0,0 +1,117 @@
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mymodule.page_layout import PageLayout
+from mymodule.page_source import _in_bounds, _ocr_lines, union_bounds
+from mymodule.pdf_pages import PdfPages
+
+
+class PreClassifier:
+    """
+    廉价的预分类：在服务器端OCR模型识别整页之前判断文档类型（skip/thesis/report/ktbg/grade）
+
+    依次尝试，能确定类型即停止：
+    1. 文件名：“开题报告”“成绩考核表”以文件名为准；文件名中的跳过关键词只是提示，
+       不单凭文件名拒绝（如“毕设终稿(答辩后).pdf”），须由下面的标题区域内容确认
+    2. 首页文本层的标题区域：有文本层时以文本层为准，不再OCR
+    3. 没有文本层（扫描件）时，以 low_res_factor 倍率只渲染、识别标题区域（外扩 margin），
+       识别行与区域OCR对同一区域的识别结果相同，识别时可直接复用；
+       low_res_on_hint 为True时只在文件名提示需跳过时才识别
+
+    classify 返回 {"kind": 类型或None, "method": 判断依据（filename/text_layer/low_res）,
+    "words": 命中的跳过关键词, "seconds": 耗时, "layout": 判断所用的首页版面（按文件名判断时为None）}，
+    kind 为None表示无法预先确定，按原流程识别。
+    """
+
+    NAME_KINDS = ("ktbg", "grade")  # 以文件名为准的类型
+
+    def __init__(self, skip_words: List[str], title_region: List[List[float]], report_region: List[List[float]],
+                 low_res_factor: float = 0.5, margin: float = 0.0):
+        self.skip_words = skip_words
+        self.title_region = title_region
+        self.report_region = report_region
+        self.low_res_factor = low_res_factor
+        self.margin = margin
+
+    def classify_text(self, text: str, report_text: str = "") -> Tuple[Optional[str], List[str]]:
+        """按标题区域文字分类，与 DocumentRecognizer 的判断顺序一致：跳过关键词 → 题目 → 检测"""
+        words = [word for word in self.skip_words if word in text]
+        if words:
+            return "skip", words
+        if "题目" in text:
+            return "thesis", []
+        if "检测" in report_text:
+            return "report", []
+        return None, []
+
+    def classify_layout(self, layout: PageLayout) -> Tuple[Optional[str], List[str]]:
+        """按首页版面的标题区域分类"""
+        return self.classify_text(*layout.region_texts([self.title_region, self.report_region]))
+
+    def classify_name(self, file_name: str) -> Tuple[Optional[str], List[str]]:
+        """
+        按文件名分类，开题报告和成绩考核表与 DocumentRecognizer 一样以文件名为准；
+        含需跳过的关键词时返回 "skip"，只是提示，是否跳过由标题区域内容决定
+        """
+        if "开题报告" in file_name:
+            return "ktbg", []
+        if "成绩考核表" in file_name:
+            return "grade", []
+        words = [word for word in self.skip_words if word in file_name]
+        if words:
+            return "skip", words
+        return None, []
+
+    def title_bounds(self) -> Tuple[float, float, float, float]:
+        """两个标题区域合并成的矩形，即低分辨率识别的范围"""
+        return union_bounds([self.title_region, self.report_region])
+
+    def classify(self, file_path: Path, get_ocr: Optional[Callable[[], Any]] = None,
+                 low_res_on_hint: bool = False) -> Dict[str, Any]:
+        """
+        预分类一个文件；get_ocr 返回OCR模型，只在需要低分辨率识别时才调用，为None时不做低分辨率识别
+        文件无法打开等错误不在这里处理，留给后续识别按原流程报错
+        """
+        start = time.perf_counter()
+        file_path = Path(file_path)
+        kind, words = self.classify_name(file_path.name.lower())
+        method, layout = "filename", None
+        if kind not in self.NAME_KINDS:
+            if low_res_on_hint and kind != "skip":
+                get_ocr = None
+            kind, words = None, []
+            try:
+                method, layout = self._first_page_layout(file_path, get_ocr)
+            except Exception:
+                method, layout = None, None
+            if layout is not None:
+                kind, words = self.classify_layout(layout)
+        return {"kind": kind, "method": method, "words": words,
+                "seconds": time.perf_counter() - start, "layout": layout}
+
+    def _first_page_layout(self, file_path: Path, get_ocr) -> Tuple[Optional[str], Optional[PageLayout]]:
+        """首页标题区域的版面及其来源（text_layer/low_res），都无法取得时返回 (None, None)"""
+        with PdfPages(file_path) as pages:
+            if pages.page_count == 0:
+                return None, None
+            lines = pages.text_lines(0)
+            if lines:
+                return "text_layer", PageLayout.from_lines(lines)
+            if get_ocr is None:
+                return None, None
+
+            # 两个标题区域合并成一个矩形，低分辨率只渲染这一块；外扩边距只用于避免切断文本行，
+            # 结果仍按左上角是否落在矩形内过滤（与 RegionSource 一致）
+            bounds = self.title_bounds()
+            factor, margin = self.low_res_factor, self.margin
+            img, (x0, y0) = pages.render_clip(0, [bounds[0] - margin, bounds[1] - margin,
+                                                  bounds[2] + margin, bounds[3] + margin], factor)
+            if img.size == 0:
+                return None, None
+            lines = []
+            for box, rec in _ocr_lines(get_ocr(), img):
+                page_box = [[(float(x) + x0) / factor, (float(y) + y0) / factor] for x, y in box]
+                if _in_bounds(page_box[0], bounds):
+                    lines.append([page_box, rec])
+            return "low_res", PageLayout.from_lines(lines)
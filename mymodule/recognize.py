@@ -1,15 +1,53 @@
 
 from pathlib import Path
-from typing import Dict, Any, List, Optional
-from paddleocr import PaddleOCR
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 
 import re
+import json
+import time
+import hashlib
+import logging
 from mymodule.json_helper import JsonHandler
+from mymodule.ocr_cache import OcrResultCache
+from mymodule.layout_store import LayoutStore
+from mymodule.page_layout import PageLayout
+from mymodule.pre_classify import PreClassifier
+from mymodule.page_source import FullPageSource, RegionSource, TextLayerSource, ReplaySource, OcrPending
+from mymodule.batch_ocr import recognize_images
+from mymodule.sign import SignatureDetector
+
+if TYPE_CHECKING:
+    from paddleocr import PaddleOCR
+
+
+class DocumentRejectedError(Exception):
+    """
+    识别得出的确定结论：文档不合格（如论文作者未签名）。同一内容再次识别结论不变，可以写入OCR缓存；
+    其他识别错误（模型加载失败、文件无法打开等）可能是暂时的，不缓存
+    """
+
+
+class SkipDocumentError(DocumentRejectedError):
+    """文档属于需跳过的过程性材料（任务书、答辩记录等）"""
 
 
 class DocumentRecognizer:
     # 定义常量
-    PAGE_NUM = 2
+    PAGE_NUM = 2  # 最多识别的页数，页面按需逐页渲染识别
+
+    # OCR模式：page 整页识别；region 只裁剪识别所需区域
+    OCR_MODES = ("page", "region")
+    # 签名检测方式：ocr 识别第二页文字判断签名；ink 在第二页“签名”标签之后检测墨迹，墨迹不明显时仍按文字判断
+    SIGNATURE_MODES = ("ocr", "ink")
+    # 区域裁剪时向外扩展的像素，避免切断跨越区域边界的文本行
+    REGION_MARGIN = 20.0
+    # identify_documents 每个推理批次的图像数
+    BATCH_SIZE = 8
+    # 渲染分辨率：fixed 固定按基准分辨率识别；adaptive 先低分辨率粗识别，提取失败的区域再以高分辨率重识别
+    RESOLUTIONS = ("fixed", "adaptive")
+    COARSE_FACTOR = 0.5  # 粗识别倍率（相对基准分辨率），分类只需认出"题目""检测"等大字
+    REFINE_FACTOR = 2.0  # 重识别倍率，学号、题目等细小文字
+    TITLE_MIN_SCORE = 0.9  # 粗识别的题目置信度低于该值时也重识别
 
     # 定义区域坐标
     THESIS_TITLE_REGIONS = [
@@ -41,27 +79,93 @@ class DocumentRecognizer:
         [500.0, 300.0], [1000.0, 300.0], [1000.0, 500.0], [500.0, 500.0]
     ]
 
-    SIGNUP_REGION = [
-        [852.0, 691.0], [1010.0, 691.0], [1010.0, 963.0], [852.0, 963.0]
-    ]
+    # OCR模型参数，同时参与识别结果缓存的配置指纹
+    OCR_PARAMS = {
+        "det_model_dir": "PP-OCRv5_server_det",
+        "text_detection_model_name": "PP-OCRv5_server_det",
+        "text_recognition_model_name": "PP-OCRv5_server_rec",
+        "use_doc_orientation_classify": False,  # 通过 use_doc_orientation_classify 参数指定不使用文档方向分类模型
+        "use_doc_unwarping": False,  # 通过 use_doc_unwarping 参数指定不使用文本图像矫正模型
+        "use_textline_orientation": False,  # 通过 use_textline_orientation 参数指定不使用文本行方向分类模型
+        "det_db_thresh": 0.1,  # 降低检测阈值（默认0.3）
+        "det_db_box_thresh": 0.1,  # 降低框阈值（默认0.6）
+        "det_db_unclip_ratio": 2.0,  # 扩大文本框范围（默认1.5）
+    }
+
+    # 需跳过的过程性文档关键词
+    SKIP_WORDS = ["任务书", "中期检查", "评审", "答辩", "进展情况", "过程记录"]
+
+    def __init__(self, ocr_mode: str = "page", cache_dir: Optional[Path] = None, text_layer: bool = True,
+                 signature_mode: str = "ocr", resolution: str = "fixed", layout_dir: Optional[Path] = None):
+        """
+        初始化OCR对象
 
-    def __init__(self):
-        """初始化OCR对象"""
+        Args:
+            ocr_mode: page 整页识别；region 只识别所需区域
+            cache_dir: 识别结果缓存目录，为None时不使用缓存
+            text_layer: 是否先尝试直接读取PDF文本层，信息不全时再OCR
+            signature_mode: ocr 识别第二页文字判断签名；ink 先检测签名标签之后的墨迹
+            resolution: fixed 固定分辨率；adaptive 粗识别后只对提取失败的区域高分辨率重识别
+            layout_dir: 保存原始识别版面的目录，供修改规则后离线回放，为None时不保存
+        """
+        if ocr_mode not in self.OCR_MODES:
+            raise ValueError(f"未知的OCR模式: {ocr_mode}")
+        if signature_mode not in self.SIGNATURE_MODES:
+            raise ValueError(f"未知的签名检测方式: {signature_mode}")
+        if resolution not in self.RESOLUTIONS:
+            raise ValueError(f"未知的渲染分辨率: {resolution}")
+        self.ocr_mode = ocr_mode
+        self.text_layer = text_layer
+        self.signature_mode = signature_mode
+        self.resolution = resolution
+        self.signature_detector = SignatureDetector()
+        # 预分类：整页OCR之前用文本层或标题区域OCR识别，提前拒绝需跳过的过程性材料；
+        # 区域模式下标题区域以区域OCR的倍率和边距识别，识别时直接复用
+        self.pre_classifier = PreClassifier(self.SKIP_WORDS, self.THESIS_TITLE_REGIONS, self.REPORT_TITLE_REGION,
+                                            low_res_factor=self.render_factor if ocr_mode == "region"
+                                            else self.COARSE_FACTOR, margin=self.REGION_MARGIN)
+        self.last_prefilter = None  # 最近一次 identify_document 的预分类结果，命中缓存时为None
         self.current_file_path = None
-        self.ocr = PaddleOCR(
-            det_model_dir="PP-OCRv5_server_det",
-            text_detection_model_name="PP-OCRv5_server_det",
-            text_recognition_model_name="PP-OCRv5_server_rec",
-            use_doc_orientation_classify=False,  # 通过 use_doc_orientation_classify 参数指定不使用文档方向分类模型
-            use_doc_unwarping=False,  # 通过 use_doc_unwarping 参数指定不使用文本图像矫正模型
-            use_textline_orientation=False,  # 通过 use_textline_orientation 参数指定不使用文本行方向分类模型
-            page_num=self.PAGE_NUM,
-            det_db_thresh=0.1,  # 降低检测阈值（默认0.3）
-            det_db_box_thresh=0.1,  # 降低框阈值（默认0.6）
-            det_db_unclip_ratio=2.0  # 扩大文本框范围（默认1.5）
-        )
-        # self.ocr = PaddleOCR(use_angle_cls=True, lang="ch", page_num=self.PAGE_NUM)
+        self.current_source = None  # 正在识别的页面来源，自适应分辨率时用于重识别
+        self._ocr = None
         self.json_handler = JsonHandler()
+        self.cache_dir = cache_dir
+        self.last_batch_stats = None  # 最近一次 identify_documents 的吞吐统计
+        self.last_prefilters = []  # 最近一次 identify_documents 各文件的预分类结果
+        self.cache = OcrResultCache(cache_dir, self.config_fingerprint()) if cache_dir is not None else None
+        self.layout_store = LayoutStore(layout_dir) if layout_dir is not None else None
+        self._file_layouts: Dict[str, Dict[tuple, PageLayout]] = {}  # 文件 -> 识别过程中得到的版面
+
+    def config_fingerprint(self) -> str:
+        """识别配置指纹：模型参数、区域坐标、跳过关键词等任一变化都会使缓存失效"""
+        config = {
+            "ocr_params": self.OCR_PARAMS,
+            "ocr_mode": self.ocr_mode,
+            "text_layer": self.text_layer,
+            "signature_mode": self.signature_mode,
+            "resolution": [self.resolution, self.COARSE_FACTOR, self.REFINE_FACTOR, self.TITLE_MIN_SCORE],
+            "signature_ink": [SignatureDetector.LABEL, SignatureDetector.AREA_WIDTH, SignatureDetector.AREA_ABOVE,
+                              SignatureDetector.AREA_BELOW, SignatureDetector.DPI, SignatureDetector.INK_CONTRAST,
+                              SignatureDetector.INK_RATIO, SignatureDetector.CONFIDENT_FACTOR],
+            "page_num": self.PAGE_NUM,
+            "region_margin": self.REGION_MARGIN,
+            "skip_words": self.SKIP_WORDS,
+            "pre_classify": ["filename_hint", "text_layer", "low_res", self.COARSE_FACTOR],
+            "regions": {name: getattr(self, name) for name in sorted(dir(self))
+                        if name.endswith(("_REGION", "_REGIONS")) or "_REGION_" in name},
+        }
+        payload = json.dumps(config, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def ocr(self) -> "PaddleOCR":
+        """首次使用时才导入paddleocr并加载OCR模型，只做结果保存等操作的实例不必加载模型"""
+        if self._ocr is None:
+            from paddleocr import PaddleOCR
+
+            self._ocr = PaddleOCR(**self.OCR_PARAMS)
+            # self._ocr = PaddleOCR(use_angle_cls=True, lang="ch", page_num=self.PAGE_NUM)
+        return self._ocr
 
     def is_point_in_region(self, point: List[float], region: List[List[float]]) -> bool:
         x, y = point
@@ -96,16 +200,15 @@ class DocumentRecognizer:
 
         return None
 
-    def extract_text_from_region(self, result: List, region: List[List[float]]) -> str:  # 从指定区域提取文本
+    def extract_text_from_region(self, result, region: List[List[float]]) -> str:  # 从指定区域提取文本
+        return self.extract_texts_from_regions(result, [region])[0]
 
-        texts = []
-        for line in result:
-            box = line[0]
-            text = line[1][0]
-            # 使用第一个点（左上角）判断是否在区域内
-            if self.is_point_in_region(box[0], region):
-                texts.append(text)
-        return " ".join(texts)
+    def extract_texts_from_regions(self, result, regions: List[List[List[float]]]) -> List[str]:
+        """
+        一次提取多个区域的文本，result 可以是 PageLayout 或 [box, (text, score)] 列表
+        使用文本框第一个点（左上角）判断是否在区域内
+        """
+        return PageLayout.from_lines(result).region_texts(regions)
 
     def extract_student_id(self, text: str) -> Optional[str]:
 
@@ -113,6 +216,33 @@ class DocumentRecognizer:
             return match.group()
         return None
 
+    def _refine(self, page_index: int, regions: Optional[List[List[List[float]]]], field: str,
+                factor: Optional[float] = None) -> Optional[PageLayout]:
+        """
+        自适应分辨率：粗识别提取 field 失败时，以高分辨率重新识别 regions（为None时整页）
+        固定分辨率、文本层页面等无法重识别的情况返回None
+        """
+        if self.resolution != "adaptive" or self.current_source is None:
+            return None
+        return self.current_source.refine(page_index, regions, factor or self.REFINE_FACTOR, field,
+                                          self.REGION_MARGIN)
+
+    def _refine_texts(self, page_index: int, regions: List[List[List[float]]], field: str) -> Optional[List[str]]:
+        """_refine 后按区域提取文本"""
+        layout = self._refine(page_index, regions, field)
+        return self.extract_texts_from_regions(layout, regions) if layout is not None else None
+
+    def _refine_student_id(self, student_id: Optional[str], region: List[List[float]]) -> Optional[str]:
+        """首页学号区域没有匹配到12位学号时高分辨率重识别该区域"""
+        if student_id is None and (texts := self._refine_texts(0, [region], "student_id")) is not None:
+            return self.extract_student_id(texts[0])
+        return student_id
+
+    def _low_confidence(self, result, region: List[List[float]]) -> bool:
+        """粗识别时区域内文字置信度偏低（文本层的置信度恒为1）"""
+        return (self.resolution == "adaptive" and
+                PageLayout.from_lines(result).region_min_scores([region])[0] < self.TITLE_MIN_SCORE)
+
     def has_signature(self, second_page_result):
         """
         判断毕业论文第二页有无签名
@@ -120,7 +250,8 @@ class DocumentRecognizer:
         :return: True/False
         """
         # 拼接所有文本内容
-        all_text = " ".join([line[1][0] for line in second_page_result if line[1][0].strip()])
+        texts = PageLayout.from_lines(second_page_result).texts
+        all_text = " ".join([text for text in texts if text.strip()])
         # 正则匹配 签名： 和 日期 之间的内容，可跨行
         # print("all_text", all_text)
         pattern = r"签名\s*[:：]\s*(.*?)\s*日期"
@@ -134,17 +265,36 @@ class DocumentRecognizer:
             # 没有匹配到“签名”和“日期”，也视为无签名
             return False
 
+    def _is_signed(self, second_page_result) -> bool:
+        """ink 方式下签名标签之后墨迹明显即为已签名，没有墨迹、不确定或找不到标签时仍按第二页文字判断"""
+        if self.signature_mode == "ink" and self.signature_detector.has_signature(self.current_file_path,
+                                                                                 second_page_result):
+            return True
+        return self.has_signature(second_page_result)
+
     def process_thesis(self, result: List) -> Dict[str, Any]:
+        """
+        :param result: [第一页识别结果, 第二页识别结果]
+        """
 
-        text = self.extract_text_from_region(result[0], self.THESIS_TITLE_REGIONS)
+        # 题目和学号区域一次查询
+        text, student_id_text = self.extract_texts_from_regions(
+            result[0], [self.THESIS_TITLE_REGIONS, self.STUDENT_ID_REGION_THESIS])
         # print(text)
         cleaned_title = self.clean_thesis_title(text)
         # print(cleaned_title)
-        # 提取学号s
-        student_id_text = self.extract_text_from_region(result[0], self.STUDENT_ID_REGION_THESIS)
-
-        student_id = self.extract_student_id(student_id_text)
-        signature_result = self.has_signature(result[1])
+        if not cleaned_title or self._low_confidence(result[0], self.THESIS_TITLE_REGIONS):
+            texts = self._refine_texts(0, [self.THESIS_TITLE_REGIONS], "title")
+            if texts is not None and self.clean_thesis_title(texts[0]):
+                cleaned_title = self.clean_thesis_title(texts[0])
+
+        student_id = self._refine_student_id(self.extract_student_id(student_id_text),
+                                             self.STUDENT_ID_REGION_THESIS)
+        signature_result = self._is_signed(result[1])
+        if not signature_result:
+            # 签名判断需要整页文字，按基准分辨率重新识别第二页
+            second_page = self._refine(1, None, "signature", factor=1.0)
+            signature_result = second_page is not None and self._is_signed(second_page)
         if signature_result:
             return {
                 "type": "thesis",
@@ -157,12 +307,13 @@ class DocumentRecognizer:
         #     "title": cleaned_title,
         #     "student_id": student_id
         # }
-        raise Exception("毕业论文作者未签名")
+        raise DocumentRejectedError("毕业论文作者未签名")
 
     def process_report(self, result: List) -> Dict[str, Any]:
 
         student_id_text = self.extract_text_from_region(result, self.STUDENT_ID_REGION_REPORT)
-        student_id = self.extract_student_id(student_id_text)
+        student_id = self._refine_student_id(self.extract_student_id(student_id_text),
+                                             self.STUDENT_ID_REGION_REPORT)
         # print(student_id_text)
         # print(student_id)
 
@@ -172,17 +323,19 @@ class DocumentRecognizer:
         }
 
     def process_ktbg(self, result: List) -> Dict[str, Any]:
-        # 开题报告处理
-        student_id_text = self.extract_text_from_region(result, self.STUDENT_ID_REGION_KTBG)
-        student_id = self.extract_student_id(student_id_text)
+        # 开题报告处理，学号和题目区域一次查询
+        student_id_text, text = self.extract_texts_from_regions(
+            result, [self.STUDENT_ID_REGION_KTBG, self.KTBG_TITLE_REGION])
+        student_id = self._refine_student_id(self.extract_student_id(student_id_text),
+                                             self.STUDENT_ID_REGION_KTBG)
 
         # title_texts = []
 
-        text = self.extract_text_from_region(result, self.KTBG_TITLE_REGION)
-
         # 合并标题文本并尝试正则匹配
         # full_title = " ".join(title_texts)
         title = self.extract_title_with_pattern(text)
+        if not title and (texts := self._refine_texts(0, [self.KTBG_TITLE_REGION], "title")) is not None:
+            title = self.extract_title_with_pattern(texts[0])
         # if not title:
         #     # 如果正则匹配失败，使用原有的清理方法作为备选
         #     title = self.clean_thesis_title(text)
@@ -195,54 +348,397 @@ class DocumentRecognizer:
 
     def process_grade(self, result: List) -> Dict[str, Any]:
         student_id_text = self.extract_text_from_region(result, self.STUDENT_ID_REGION_CJKH)
-        student_id = self.extract_student_id(student_id_text)
+        student_id = self._refine_student_id(self.extract_student_id(student_id_text),
+                                             self.STUDENT_ID_REGION_CJKH)
 
         return {
             "type": "grade",
             "student_id": student_id
         }
 
+    @property
+    def render_factor(self) -> float:
+        """OCR渲染倍率：自适应分辨率时先粗识别"""
+        return self.COARSE_FACTOR if self.resolution == "adaptive" else 1.0
+
+    def _open_source(self, file_path: Path, title_layout: Optional[PageLayout] = None):
+        """打开OCR来源；title_layout 为预分类已识别的首页标题区域，区域模式下直接复用，不再识别"""
+        factor = self.render_factor
+        if self.ocr_mode == "region":
+            source = RegionSource(self.ocr, file_path, self.PAGE_NUM, self.REGION_MARGIN, render_factor=factor)
+            if title_layout is not None:
+                source.seed(0, self.pre_classifier.title_bounds(), title_layout)
+            return source
+        return FullPageSource(self.ocr, file_path, self.PAGE_NUM, render_factor=factor)
+
+    def pre_classify(self, file_path: Path) -> Optional[PageLayout]:
+        """
+        预分类，结果记入 last_prefilter；需跳过的文档直接抛出 SkipDocumentError，不再进入文本层识别和整页OCR
+        返回OCR识别的首页标题区域版面（交给 _open_source 复用），没有时返回None
+
+        扫描件在区域模式下总是识别标题区域：区域模式识别时本就先识别这一块；
+        整页模式首页总要整页识别，只在文件名提示需跳过时才低分辨率识别标题区域加以确认
+        """
+        outcome = self.pre_classifier.classify(file_path, lambda: self.ocr,
+                                               low_res_on_hint=self.ocr_mode != "region")
+        layout = outcome.pop("layout")
+        if layout is not None:
+            key = ("text", 0) if outcome["method"] == "text_layer" else ("low_res", 0)
+            self._collect_layouts(file_path, {key: layout})
+        self.last_prefilter = outcome
+        if outcome["kind"] == "skip":
+            logging.info(f"{Path(file_path).name} 预分类（{outcome['method']}）为需跳过的文档，"
+                         f"耗时 {outcome['seconds']:.3f}s")
+            raise SkipDocumentError(f"检测到需跳过的关键词: {', '.join(outcome['words'])}")
+        return layout if outcome["method"] == "low_res" else None
+
     def identify_document(self, file_path: Path) -> Dict[str, Any]:  # 识别文档类型并提取信息
+        self.last_prefilter = None
+        if self.cache is None:
+            return self._identify_document(file_path)
+
+        # 命中缓存时直接返回上次的结果（或重新抛出上次的识别错误），不再OCR
+        cache_key = self._cache_key(file_path)
+        entry = self._cache_get(cache_key)
+        if entry is not None:
+            logging.info(f"命中OCR缓存: {Path(file_path).name}")
+            self.current_file_path = Path(file_path)
+            if "error" in entry:
+                raise DocumentRejectedError(entry["error"])
+            return entry["result"]
+
+        try:
+            result = self._identify_document(file_path)
+        except DocumentRejectedError as e:
+            # 只缓存确定的结论，其他错误直接抛出，下次重新识别
+            self.cache.put(cache_key, {"error": str(e), "rejected": True})
+            raise
+        self.cache.put(cache_key, {"result": self._cacheable(result)})
+        return result
+
+    def _cache_key(self, file_path: Path) -> str:
+        """
+        缓存键：文件内容哈希，加上按文件名得出的分类（开题报告、成绩考核表、需跳过的关键词）。
+        识别结果也取决于文件名，同样的内容换了文件名重新上传时不能沿用原文件名下的结论
+        """
+        cache_key = OcrResultCache.file_hash(file_path)
+        kind, words = self.pre_classifier.classify_name(Path(file_path).name.lower())
+        if kind is not None:
+            name_class = "-".join([kind] + words)
+            cache_key += "-" + hashlib.sha256(name_class.encode('utf-8')).hexdigest()[:8]
+        return cache_key
+
+    def _cache_get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存条目；旧版本缓存的非结论性错误（如模型未能加载）视为未命中"""
+        entry = self.cache.get(cache_key)
+        if entry is not None and "error" in entry and not entry.get("rejected"):
+            return None
+        return entry
+
+    @staticmethod
+    def _cacheable(result: Dict[str, Any]) -> Dict[str, Any]:
+        """缓存中不保存重识别次数，命中缓存时并没有识别"""
+        return {key: value for key, value in result.items() if key != "escalations"}
+
+    @staticmethod
+    def _is_complete(result: Dict[str, Any]) -> bool:
+        """识别结果是否完整：类型已确定、有学号，论文和开题报告还需有题目"""
+        if result.get("type") not in ("thesis", "report", "ktbg", "grade") or not result.get("student_id"):
+            return False
+        if result["type"] in ("thesis", "ktbg") and not result.get("title"):
+            return False
+        return True
+
+    def _identify_from_text_layer(self, file_path: Path, allow_ocr: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        优先使用PDF文本层识别（生成的查重报告、Word导出的论文等），结果不完整时返回None以便改用OCR
+        文本层中出现需跳过的关键词时直接抛出 SkipDocumentError
+
+        论文的手写签名不在文本层中：首页信息完整时，allow_ocr 为True则只对其余页OCR，
+        此时签名检查的结论即为最终结论（ink 方式同样如此：文本层第二页墨迹不明显时改由OCR识别该页再判断）
+        """
+        file_path = Path(file_path)
+        try:
+            source = TextLayerSource(file_path, self.PAGE_NUM)
+        except Exception as e:
+            logging.info(f"读取文本层失败，改用OCR {file_path.name}: {str(e)}")
+            return None
+        error = None
+        try:
+            result = self._identify_with_source(file_path, source)
+        except SkipDocumentError:
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            source.close()
+
+        if error is None:
+            if self._is_complete(result):
+                logging.info(f"{file_path.name} 使用文本层识别，OCR页数: 0/{self.PAGE_NUM}")
+                return result
+        elif allow_ocr and source.accessed_pages - {0}:
+            hybrid = TextLayerSource(file_path, self.PAGE_NUM, fallback=self._open_source(file_path),
+                                     ocr_pages=source.accessed_pages - {0})
+            try:
+                result = self._identify_with_source(file_path, hybrid)
+            finally:
+                logging.info(f"{file_path.name} 首页使用文本层识别，OCR页数: {hybrid.recognized_pages}/{self.PAGE_NUM}")
+                hybrid.close()
+            if self._is_complete(result):
+                return result
+
+        logging.info(f"文本层信息不全，改用OCR: {file_path.name}")
+        return None
+
+    def _identify_document(self, file_path: Path) -> Dict[str, Any]:
+        """识别单个文件；启用版面保存时，无论识别成败都保存识别过程中得到的版面"""
+        try:
+            result = self._recognize_document(file_path)
+        except Exception as e:
+            self._keep_layouts(file_path, error=str(e))
+            raise
+        self._keep_layouts(file_path, result=result)
+        return result
+
+    def _recognize_document(self, file_path: Path) -> Dict[str, Any]:
+
+        title_layout = self.pre_classify(file_path)
+        if self.text_layer:
+            result = self._identify_from_text_layer(file_path)
+            if result is not None:
+                return result
 
         try:
             # OCR识别
-            file_path_str = str(file_path)
-            result = self.ocr.ocr(file_path_str)
-            if not result or not result[0]:  # 使用第一页的结果
+            source = self._open_source(file_path, title_layout)
+        except Exception as e:
+            raise Exception(str(e))
+        try:
+            return self._identify_with_source(file_path, source)
+        finally:
+            # 只有论文需要第二页（签名），其余类型识别完第一页即可确定
+            logging.info(f"{Path(file_path).name} OCR页数: {source.recognized_pages}/{self.PAGE_NUM}")
+            source.close()
+
+    def _identify_with_source(self, file_path: Path, source) -> Dict[str, Any]:
+        """识别并提取信息；自适应分辨率下发生过重识别时，结果的 escalations 为各字段的重识别次数"""
+        self.current_source = source
+        try:
+            result = self._extract_with_source(file_path, source)
+        except OcrPending:
+            raise
+        except Exception:
+            self._collect_layouts(file_path, source.layouts())
+            raise
+        finally:
+            self.current_source = None
+        self._collect_layouts(file_path, source.layouts())
+        if source.escalations:
+            logging.info(f"{Path(file_path).name} 粗识别未能提取的区域已重识别: {source.escalations}")
+            result = {**result, "escalations": dict(source.escalations)}
+        return result
+
+    def _extract_with_source(self, file_path: Path, source) -> Dict[str, Any]:
+
+        try:
+            if not source.has_pages():  # 使用第一页的结果
                 raise Exception("OCR识别失败")
 
-            first_page_result = result[0]
-            # second_page_result = result[1]
             self.current_file_path = Path(file_path)
 
             # 检查文件名是否为开题报告或成绩考核表
             file_name = file_path.name.lower()
             if "开题报告" in file_name:
-                return self.process_ktbg(first_page_result)
+                return self.process_ktbg(
+                    source.page(0, [self.KTBG_TITLE_REGION, self.STUDENT_ID_REGION_KTBG]))
 
             if "成绩考核表" in file_name:
-                return self.process_grade(first_page_result)
+                return self.process_grade(source.page(0, [self.STUDENT_ID_REGION_CJKH]))
+
+            # 论文题目和查重报告标题区域一次查询（两区域重叠，区域模式下也只识别一次）
+            first_page_result = source.page(0, [self.THESIS_TITLE_REGIONS, self.REPORT_TITLE_REGION])
+            text, report_text = self.extract_texts_from_regions(
+                first_page_result, [self.THESIS_TITLE_REGIONS, self.REPORT_TITLE_REGION])
+
+            # 粗识别认不出文档类型时，高分辨率重识别标题区域
+            skip_words = self.SKIP_WORDS
+            if not (any(word in text for word in skip_words) or "题目" in text or "检测" in report_text):
+                texts = self._refine_texts(0, [self.THESIS_TITLE_REGIONS, self.REPORT_TITLE_REGION], "type")
+                if texts is not None:
+                    text, report_text = texts
 
             # 检查是否为论文本体
-            text = self.extract_text_from_region(first_page_result, self.THESIS_TITLE_REGIONS)
-           
-            skip_words = ["任务书", "中期检查", "评审", "答辩", "进展情况", "过程记录"]
+
             if any(word in text for word in skip_words):
-                raise Exception(f"检测到需跳过的关键词: {', '.join([w for w in skip_words if w in text])}")
+                raise SkipDocumentError(f"检测到需跳过的关键词: {', '.join([w for w in skip_words if w in text])}")
             if "题目" in text:
-                return self.process_thesis(result)
+                return self.process_thesis([
+                    source.page(0, [self.THESIS_TITLE_REGIONS, self.STUDENT_ID_REGION_THESIS]),
+                    source.page(1)
+                ])
 
             # 检查是否为查重报告
-            report_text = self.extract_text_from_region(first_page_result, self.REPORT_TITLE_REGION)
             # print("report_text:" + report_text)
             if "检测" in report_text:
-                return self.process_report(first_page_result)
+                return self.process_report(source.page(0, [self.STUDENT_ID_REGION_REPORT]))
 
             return {"type": "unknown"}
 
+        except (OcrPending, DocumentRejectedError):
+            raise
         except Exception as e:
             raise Exception(str(e))
 
+    def _collect_layouts(self, file_path: Path, layouts: Dict[tuple, PageLayout]) -> None:
+        if self.layout_store is not None and layouts:
+            self._file_layouts.setdefault(str(Path(file_path)), {}).update(layouts)
+
+    def _keep_layouts(self, file_path: Path, result: Optional[Dict[str, Any]] = None,
+                      error: Optional[str] = None) -> None:
+        """把文件识别过程中收集的版面连同识别结论写入版面库"""
+        layouts = self._file_layouts.pop(str(Path(file_path)), None)
+        if self.layout_store is None or not layouts:
+            return
+        settings = {"ocr_mode": self.ocr_mode, "signature_mode": self.signature_mode,
+                    "resolution": self.resolution, "text_layer": self.text_layer}
+        try:
+            self.layout_store.save(file_path, layouts, settings,
+                                   result=self._cacheable(result) if result is not None else None, error=error)
+        except Exception as e:
+            logging.warning(f"保存识别版面失败 {Path(file_path).name}: {str(e)}")
+
+    def replay(self, file_path: Path, layouts: Dict[tuple, PageLayout]) -> Dict[str, Any]:
+        """
+        用 LayoutStore 保存的版面重新执行预分类、文档分类和 process_* 信息提取，不做任何渲染和模型推理，
+        用于验证区域坐标、跳过关键词、正则等规则的修改；ink 方式检测签名时仍需原文件
+        """
+        file_path = Path(file_path)
+        kind, words = self.pre_classifier.classify_name(file_path.name.lower())
+        if kind not in PreClassifier.NAME_KINDS:
+            # 文件名中的跳过关键词只是提示，与识别时一样由标题区域内容决定
+            kind, words = None, []
+            for key in (("text", 0), ("low_res", 0)):
+                if key in layouts and len(layouts[key]):
+                    kind, words = self.pre_classifier.classify_layout(layouts[key])
+                    break
+        if kind == "skip":
+            raise SkipDocumentError(f"检测到需跳过的关键词: {', '.join(words)}")
+        return self._identify_with_source(file_path, ReplaySource(layouts))
+
+    def identify_documents(self, file_paths: List[Path]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        批量识别多个文件，返回与输入顺序一致的 (识别结果, 错误信息) 列表
+
+        各文件按 identify_document 的流程推进，遇到需要识别的页面（或区域）时暂停；
+        所有文件暂停后把待识别的图像合并成固定大小的批次统一推理，再把结果分发回各文件继续，
+        直到全部文件得出结论。识别结果同样读写OCR缓存。
+        各文件的预分类结果记入 last_prefilters（与输入顺序一致，命中缓存的为None）。
+        """
+        start = time.perf_counter()
+        outcomes: List[Optional[Tuple[Optional[Dict[str, Any]], Optional[str]]]] = [None] * len(file_paths)
+        self.last_prefilters = [None] * len(file_paths)
+        pending = {}  # 序号 -> (来源, 内容哈希)
+        identified = []  # 未命中缓存、实际识别的文件序号
+        rejected = set()  # 识别结论为不合格（可缓存）的文件序号
+        image_count = 0
+        page_count = 0
+
+        for index, file_path in enumerate(file_paths):
+            file_path = Path(file_path)
+            cache_key = None
+            if self.cache is not None:
+                try:
+                    cache_key = self._cache_key(file_path)
+                except Exception as e:
+                    # 文件无法读取（如扫描后被删除或替换）只算该文件失败，不中断整批
+                    outcomes[index] = (None, str(e))
+                    continue
+                entry = self._cache_get(cache_key)
+                if entry is not None:
+                    logging.info(f"命中OCR缓存: {file_path.name}")
+                    outcomes[index] = (None, entry["error"]) if "error" in entry else (entry["result"], None)
+                    continue
+            identified.append(index)
+            title_layout = None
+            try:
+                title_layout = self.pre_classify(file_path)
+                if self.text_layer:
+                    # 批量识别中不单独OCR其余页，文本层不完整的文件整体进入批量OCR
+                    result = self._identify_from_text_layer(file_path, allow_ocr=False)
+                    outcomes[index] = (result, None) if result is not None else None
+            except SkipDocumentError as e:
+                outcomes[index] = (None, str(e))
+                rejected.add(index)
+            self.last_prefilters[index] = self.last_prefilter
+            if outcomes[index] is not None:
+                self._cache_outcome(cache_key, outcomes[index], index in rejected)
+                continue
+            try:
+                source = self._open_source(file_path, title_layout)
+            except Exception as e:
+                outcomes[index] = (None, str(e))
+                continue
+            source.deferred = True
+            pending[index] = (source, cache_key)
+
+        while pending:
+            requests = []
+            for index in list(pending):
+                source, cache_key = pending[index]
+                file_path = Path(file_paths[index])
+                try:
+                    outcome = (self._identify_with_source(file_path, source), None)
+                except OcrPending as request:
+                    requests.append(request)
+                    continue
+                except DocumentRejectedError as e:
+                    outcome = (None, str(e))
+                    rejected.add(index)
+                except Exception as e:
+                    outcome = (None, str(e))
+
+                outcomes[index] = outcome
+                page_count += source.recognized_pages
+                logging.info(f"{file_path.name} OCR页数: {source.recognized_pages}/{self.PAGE_NUM}")
+                source.close()
+                del pending[index]
+                self._cache_outcome(cache_key, outcome, index in rejected)
+
+            if requests:
+                lines_list = recognize_images(self.ocr, [request.image for request in requests], self.BATCH_SIZE)
+                for request, lines in zip(requests, lines_list):
+                    request.source.prefill(request.key, lines)
+                image_count += len(requests)
+
+        for index in identified:
+            result, error = outcomes[index]
+            self._keep_layouts(file_paths[index], result=result, error=error)
+
+        elapsed = time.perf_counter() - start
+        pages_per_second = page_count / elapsed if elapsed > 0 else 0.0
+        self.last_batch_stats = {
+            "files": len(file_paths),
+            "pages": page_count,
+            "images": image_count,
+            "seconds": elapsed,
+            "pages_per_second": pages_per_second
+        }
+        logging.info(f"批量识别 {len(file_paths)} 个文件，OCR {page_count} 页（{image_count} 张图像），"
+                     f"耗时 {elapsed:.2f}s，{pages_per_second:.2f} 页/秒")
+        return outcomes
+
+    def _cache_outcome(self, cache_key: Optional[str], outcome: Tuple[Optional[Dict[str, Any]], Optional[str]],
+                       rejected: bool) -> None:
+        """批量识别的结果写入缓存；错误只在是确定的结论（rejected）时缓存"""
+        if self.cache is None:
+            return
+        result, error = outcome
+        if error is None:
+            self.cache.put(cache_key, {"result": self._cacheable(result)})
+        elif rejected:
+            self.cache.put(cache_key, {"error": error, "rejected": True})
+
     def save_recognition_result(self, result: Dict[str, Any], output_dir: Path, student_id: str) -> Path:
 
         if not student_id:
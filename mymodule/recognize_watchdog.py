@@ -0,0 +1,228 @@
+import logging
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from mymodule.review_metrics import review_metrics
+
+# (识别结果, 错误信息, 识别耗时, 预分类结果)，与 main._recognize_in_worker 的返回值一致
+Outcome = Tuple[Optional[Dict[str, Any]], Optional[str], float, Optional[Dict[str, Any]]]
+
+
+def _worker_main(conn, recognizer_kwargs: Dict[str, Any]) -> None:
+    """识别子进程：先加载模型，之后逐个识别主进程发来的文件，收到None时退出"""
+    from mymodule.recognize import DocumentRecognizer
+
+    try:
+        recognizer = DocumentRecognizer(**recognizer_kwargs)
+        recognizer.ocr  # 模型加载耗时不计入单个文件的时限
+    except Exception as e:
+        conn.send(("failed", str(e)))
+        return
+    conn.send(("ready", None))
+    while True:
+        try:
+            file_path = conn.recv()
+        except EOFError:
+            return
+        if file_path is None:
+            return
+        start = time.perf_counter()
+        try:
+            result, error = recognizer.identify_document(file_path), None
+        except Exception as e:
+            result, error = None, str(e)
+        conn.send(("done", (result, error, time.perf_counter() - start, recognizer.last_prefilter)))
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """进程的常驻内存（MB），读取 /proc，其他平台返回None"""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class _Worker:
+    """一个识别子进程及其正在识别的文件"""
+
+    def __init__(self, context, recognizer_kwargs: Dict[str, Any]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, recognizer_kwargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.index: Optional[int] = None  # 正在识别的文件序号
+        self.started = 0.0
+        self.files = 0  # 已识别的文件数
+
+    @property
+    def busy(self) -> bool:
+        return self.index is not None
+
+    def submit(self, index: int, file_path: Path) -> None:
+        self.index = index
+        self.started = time.perf_counter()
+        self.conn.send(file_path)
+
+    def stop(self, kill: bool = False) -> None:
+        if not kill and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                kill = True
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class RecognitionWatchdog:
+    """
+    在受监控的子进程中识别文件，每个文件有时间和内存限制
+
+    - 单个文件识别超过 timeout 秒，或识别进程常驻内存超过 memory_limit_mb，立即终止该进程，
+      该文件记为识别失败并给出原因，换一个新进程继续识别后面的文件
+    - 每个进程识别 recycle_after 个文件后，或识别完一个文件时内存已超过限制的 RECYCLE_RATIO，
+      正常退出换新进程，回收Paddle运行时逐渐泄漏的内存
+    - 只在还有待识别的文件时才换新进程，最后几个文件识别完后不再启动、加载用不上的进程
+    - 模型在进程启动时加载，加载耗时不计入单个文件的时限
+
+    内存限制依赖 /proc，其他平台只做时间限制。
+    """
+
+    POLL_INTERVAL = 0.2  # 检查超时和内存的间隔（秒）
+    RECYCLE_RATIO = 0.8
+    MAX_START_FAILURES = 3  # 连续多少个新进程没能加载模型就放弃
+
+    def __init__(self, recognizer_kwargs: Dict[str, Any], workers: int = 1, timeout: Optional[float] = None,
+                 memory_limit_mb: Optional[float] = None, recycle_after: int = 100):
+        self.recognizer_kwargs = recognizer_kwargs
+        self.workers = max(1, workers)
+        self.timeout = timeout or None
+        self.memory_limit_mb = memory_limit_mb or None
+        self.recycle_after = recycle_after
+        # spawn 启动子进程，避免fork带有线程的Flask进程和Paddle运行时
+        self._context = multiprocessing.get_context("spawn")
+        self._start_failures = 0
+        self.kills: Dict[str, int] = {}  # 原因 -> 终止的进程数
+        self.killed_files: Dict[Path, str] = {}  # 因超时、内存超限或进程崩溃而失败的文件 -> 原因
+        self.recycles = 0
+
+    def map(self, file_paths: List[Path]) -> Iterator[Outcome]:
+        """按输入顺序依次产出各文件的识别结果；提前关闭时终止全部识别进程"""
+        pending = deque(enumerate(file_paths))
+        outcomes: Dict[int, Outcome] = {}
+        workers = [self._spawn() for _ in range(min(self.workers, len(file_paths)))]
+        try:
+            next_index = 0
+            while next_index < len(file_paths):
+                if next_index in outcomes:
+                    yield outcomes.pop(next_index)
+                    next_index += 1
+                    continue
+                for worker in workers:
+                    if worker.ready and not worker.busy and pending:
+                        worker.submit(*pending.popleft())
+                self._poll(workers, pending, file_paths, outcomes)
+        finally:
+            for worker in workers:
+                worker.stop(kill=worker.busy)
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._context, self.recognizer_kwargs)
+
+    def _respawn(self, workers: List[Optional[_Worker]], slot: int, pending: deque) -> None:
+        """换一个新进程；没有待识别的文件时不再启动，该位置留空，由 _poll 移除"""
+        workers[slot] = self._spawn() if pending else None
+
+    def _poll(self, workers: List[_Worker], pending: deque, file_paths: List[Path],
+              outcomes: Dict[int, Outcome]) -> None:
+        ready = wait([worker.conn for worker in workers], timeout=self.POLL_INTERVAL)
+        try:
+            self._check(workers, ready, pending, file_paths, outcomes)
+        finally:
+            workers[:] = [worker for worker in workers if worker is not None]
+
+    def _check(self, workers: List[Optional[_Worker]], ready: list, pending: deque, file_paths: List[Path],
+               outcomes: Dict[int, Outcome]) -> None:
+        """处理各进程发来的消息，检查正在识别的文件是否超时、超出内存限制"""
+        for slot, worker in enumerate(workers):
+            if worker.conn in ready:
+                try:
+                    message, payload = worker.conn.recv()
+                except (EOFError, OSError):
+                    # 进程被系统终止（如内存不足）或崩溃
+                    worker.process.join(1)
+                    code = worker.process.exitcode
+                    self._replace(workers, slot, pending, file_paths, outcomes, "crashed",
+                                  f"识别进程异常退出（退出码 {code}）")
+                    continue
+                if message == "ready":
+                    worker.ready = True
+                    self._start_failures = 0
+                elif message == "failed":
+                    self._start_failures += 1
+                    if self._start_failures >= self.MAX_START_FAILURES:
+                        raise Exception(f"识别进程启动失败: {payload}")
+                    self._respawn(workers, slot, pending)
+                    worker.stop()
+                else:
+                    outcomes[worker.index] = payload
+                    worker.index = None
+                    worker.files += 1
+                    if self._should_recycle(worker):
+                        self.recycles += 1
+                        review_metrics.observe_worker_recycle()
+                        logging.info(f"识别进程已识别 {worker.files} 个文件，回收并换新进程")
+                        worker.stop()
+                        self._respawn(workers, slot, pending)
+                continue
+
+            if not worker.busy:
+                continue
+            elapsed = time.perf_counter() - worker.started
+            if self.timeout is not None and elapsed > self.timeout:
+                logging.error(f"识别超时，终止识别进程: {file_paths[worker.index]}")
+                self._replace(workers, slot, pending, file_paths, outcomes, "timeout",
+                              f"识别超时：超过 {self.timeout:g} 秒，已终止识别")
+                continue
+            rss = _rss_mb(worker.process.pid) if self.memory_limit_mb is not None else None
+            if rss is not None and rss > self.memory_limit_mb:
+                logging.error(f"识别内存超限（{rss:.0f}MB），终止识别进程: {file_paths[worker.index]}")
+                self._replace(workers, slot, pending, file_paths, outcomes, "memory",
+                              f"识别内存超限：占用 {rss:.0f}MB，超过 {self.memory_limit_mb:g}MB，已终止识别")
+
+    def _should_recycle(self, worker: _Worker) -> bool:
+        if self.recycle_after and worker.files >= self.recycle_after:
+            return True
+        if self.memory_limit_mb is not None:
+            rss = _rss_mb(worker.process.pid)
+            return rss is not None and rss > self.memory_limit_mb * self.RECYCLE_RATIO
+        return False
+
+    def _replace(self, workers: List[Optional[_Worker]], slot: int, pending: deque, file_paths: List[Path],
+                 outcomes: Dict[int, Outcome], reason: str, message: str) -> None:
+        """终止进程，正在识别的文件记为失败，还有待识别的文件时换一个新进程"""
+        worker = workers[slot]
+        if worker.busy:
+            outcomes[worker.index] = (None, message, time.perf_counter() - worker.started, None)
+            self.killed_files[file_paths[worker.index]] = message
+        elif not worker.ready:
+            # 加载模型时就退出，与启动失败同样计数，避免无限重启
+            self._start_failures += 1
+            if self._start_failures >= self.MAX_START_FAILURES:
+                worker.stop(kill=True)
+                raise Exception(message)
+        worker.stop(kill=True)
+        self.kills[reason] = self.kills.get(reason, 0) + 1
+        review_metrics.observe_watchdog_kill(reason)
+        self._respawn(workers, slot, pending)
@@ -0,0 +1,90 @@
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from mymodule.recognize import DocumentRecognizer
+
+
+class RecognizerPool:
+    """
+    常驻内存的识别器池，供API跨请求复用，避免每次审核都重新加载OCR模型
+
+    每种OCR模式（及签名检测方式、渲染分辨率）最多创建 size 个识别器；同一识别器同一时间只借给一个线程使用。
+    识别模块（paddleocr、fitz、cv2等）在第一次创建识别器时才导入，通常由后台预热完成，不拖慢API启动。
+    """
+
+    def __init__(self, size: int = 1, cache_dir: Optional[Path] = None, default_mode: str = "page"):
+        self.size = size
+        self.cache_dir = cache_dir
+        self.default_mode = default_mode
+        self._idle: Dict[Tuple[str, str, str], List["DocumentRecognizer"]] = {}
+        self._created: Dict[Tuple[str, str, str], int] = {}
+        self._cond = threading.Condition()
+        self._ready = threading.Event()
+        self._warm_up_error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        """预热完成（默认模式的模型已加载）"""
+        return self._ready.is_set()
+
+    @property
+    def warm_up_error(self) -> Optional[str]:
+        return self._warm_up_error
+
+    def warm_up(self) -> threading.Thread:
+        """在后台线程中加载默认模式的识别器模型"""
+        thread = threading.Thread(target=self._warm_up, name="recognizer-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up(self) -> None:
+        try:
+            logging.info("开始预热OCR模型")
+            with self.acquire(self.default_mode) as recognizer:
+                recognizer.ocr  # 触发模型加载
+            logging.info("OCR模型预热完成")
+            self._ready.set()
+        except Exception as e:
+            self._warm_up_error = str(e)
+            logging.error(f"OCR模型预热失败: {str(e)}")
+
+    @contextmanager
+    def acquire(self, ocr_mode: Optional[str] = None, signature_mode: Optional[str] = None,
+                resolution: Optional[str] = None):
+        """借出一个识别器，用完自动归还；池已满且全部被占用时等待"""
+        key = (ocr_mode or self.default_mode, signature_mode or "ocr", resolution or "fixed")
+        recognizer = self._take(key)
+        layout_store = recognizer.layout_store
+        try:
+            yield recognizer
+        finally:
+            # 借用方按本次任务设置的版面保存（keep_layouts）不带给之后的任务和预取
+            recognizer.layout_store = layout_store
+            with self._cond:
+                self._idle[key].append(recognizer)
+                self._cond.notify()
+
+    def _take(self, key: Tuple[str, str, str]) -> "DocumentRecognizer":
+        with self._cond:
+            idle = self._idle.setdefault(key, [])
+            while not idle and self._created.get(key, 0) >= self.size:
+                self._cond.wait()
+            if idle:
+                return idle.pop()
+            self._created[key] = self._created.get(key, 0) + 1
+
+        ocr_mode, signature_mode, resolution = key
+        try:
+            from mymodule.recognize import DocumentRecognizer
+
+            return DocumentRecognizer(ocr_mode=ocr_mode, cache_dir=self.cache_dir, signature_mode=signature_mode,
+                                      resolution=resolution)
+        except Exception:
+            with self._cond:
+                self._created[key] -= 1
+                self._cond.notify()
+            raise
@@ -1,8 +1,19 @@
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import filecmp
+import logging
+import os
 import shutil
+import sys
 from mymodule.json_helper import JsonHandler
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # Linux ioctl：克隆整个文件（写时复制）
+
 
 class FileRenamer:
 
@@ -14,11 +25,18 @@ class FileRenamer:
         "grade": "CL"  # 支撑材料
     }
 
+    # 文件放置方式：copy 总是复制；auto 优先写时复制或硬链接，不支持时复制
+    PLACEMENT_MODES = ("copy", "auto")
+
     def __init__(self, 
                  academic_year: str = "2324", 
                  province_code: str = "44",
-                 unit_code: str = "14655", major_code: str = "080901"):
+                 unit_code: str = "14655", major_code: str = "080901",
+                 placement: str = "auto"):
+        if placement not in self.PLACEMENT_MODES:
+            raise ValueError(f"未知的文件放置方式: {placement}")
         self.json_handler = JsonHandler()
+        self.placement = placement
         self.academic_year = academic_year  # 学年度
         self.province_code = province_code  # 省市代码
         self.unit_code = unit_code  # 单位代码
@@ -46,36 +64,94 @@ class FileRenamer:
 
         return new_filename
 
-    def rename_file(self, source_file: Path, json_file: Path, target_dir: Path) -> Path:
+    def rename_file(self, source_file: Path, json_file: Optional[Path], target_dir: Path,
+                    result: Optional[Dict[str, Any]] = None) -> Path:
+        """
+        按识别结果把文件放到 target_dir 下的规范文件名
+        传入 result（内存中的识别结果）时不再读取 json_file；目标文件内容相同时跳过写入
+        """
 
         try:
             # 检查文件是否存在
             if not source_file.exists():
                 raise FileNotFoundError(f"源文件不存在: {source_file}")
-            if not json_file.exists():
-                raise FileNotFoundError(f"JSON文件不存在: {json_file}")
+
+            if result is None:
+                if not json_file.exists():
+                    raise FileNotFoundError(f"JSON文件不存在: {json_file}")
+                # 读取JSON数据
+                result = self.json_handler.load_from_json(json_file)
 
             # 创建目标目录
             target_dir.mkdir(parents=True, exist_ok=True)
 
-            # 读取JSON数据
-            json_data = self.json_handler.load_from_json(json_file)
-
             # 生成新文件名
-            new_filename = self.generate_new_filename(json_data, source_file.suffix.lstrip('.'))
+            new_filename = self.generate_new_filename(result, source_file.suffix.lstrip('.'))
 
             # 构造目标文件路径
             target_file = target_dir / new_filename
 
-            # 如果目标文件已存在，先删除
-            if target_file.exists():
-                target_file.unlink()
+            if self._is_identical(source_file, target_file):
+                logging.info(f"目标文件已是最新，跳过: {target_file}")
+                return target_file
 
-            # 复制文件到新位置并重命名
-            shutil.copy2(source_file, target_file)
+            method = self._place(source_file, target_file)
 
             print(f"文件重命名成功: {target_file}")
+            logging.info(f"文件放置方式: {method} {target_file}")
             return target_file
 
         except Exception as e:
             raise Exception(f"重命名文件时发生错误: {str(e)}")
+
+    @staticmethod
+    def _is_identical(source_file: Path, target_file: Path) -> bool:
+        """目标文件与源文件是同一文件（硬链接）或内容完全相同"""
+        try:
+            target_stat = target_file.stat()
+        except FileNotFoundError:
+            return False
+        source_stat = source_file.stat()
+        if (source_stat.st_dev, source_stat.st_ino) == (target_stat.st_dev, target_stat.st_ino):
+            return True
+        return source_stat.st_size == target_stat.st_size and filecmp.cmp(source_file, target_file, shallow=False)
+
+    def _place(self, source_file: Path, target_file: Path) -> str:
+        """
+        先放到临时文件再替换目标，返回实际使用的方式
+        auto 依次尝试：写时复制（reflink，仅Linux且文件系统支持）、硬链接、复制；
+        源文件和目标不在同一文件系统或不支持时自动退回下一种。
+        硬链接与上传文件共用数据，上传接口以替换而非覆盖写入的方式保存文件，重新上传不会改动已放置的文件
+        """
+        tmp_file = target_file.with_name(target_file.name + '.tmp')
+        if tmp_file.exists():
+            tmp_file.unlink()
+        try:
+            methods = ["copy"] if self.placement == "copy" else ["reflink", "hardlink", "copy"]
+            for method in methods:
+                try:
+                    if method == "reflink":
+                        self._reflink(source_file, tmp_file)
+                    elif method == "hardlink":
+                        os.link(source_file, tmp_file)
+                    else:
+                        shutil.copy2(source_file, tmp_file)
+                    os.replace(tmp_file, target_file)
+                    return method
+                except OSError:
+                    if method == "copy":
+                        raise
+                    if tmp_file.exists():
+                        tmp_file.unlink()
+        finally:
+            if tmp_file.exists():
+                tmp_file.unlink()
+
+    @staticmethod
+    def _reflink(source_file: Path, target_file: Path) -> None:
+        """写时复制克隆文件（btrfs、xfs等），不支持时抛出OSError"""
+        if fcntl is None or not sys.platform.startswith("linux"):
+            raise OSError("当前平台不支持reflink")
+        with open(source_file, 'rb') as src, open(target_file, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source_file, target_file)
@@ -0,0 +1,195 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 旧版按 <学号>/<类型>_<时间戳>.json 保存的识别结果
+_JSON_NAME = re.compile(r'^(?P<type>[a-z]+)_(?P<ts>\d{8}_\d{6})\.json$')
+
+
+class RecognitionResultStore:
+    """
+    识别结果库（SQLite）：每次识别追加一行，按学号、类型建索引，可查询某学号（某类型）的最新结果
+
+    取代原先每次识别都在 recognition_results/<学号>/ 下新建 <类型>_<时间戳>.json 的做法；
+    旧的JSON目录可通过 import_json_tree 导入，export_json 按原格式导出以兼容依赖JSON文件的工具。
+    """
+
+    DB_NAME = "results.sqlite3"
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    student_id TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    source TEXT,
+                    data TEXT NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_student "
+                               "ON results (student_id, type, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_type ON results (type, id)")
+            # 导入旧JSON文件时以文件路径去重，重复导入不会产生重复记录
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_results_imported "
+                               "ON results (source) WHERE source LIKE 'json:%'")
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    @staticmethod
+    def _row(result: Dict[str, Any], student_id: str, source: Optional[str],
+             created_at: str) -> Tuple[str, str, str, Optional[str], str]:
+        if not student_id:
+            raise Exception("无法保存：识别结果中没有学号")
+        return (str(student_id), result.get('type', 'unknown'), created_at, source,
+                json.dumps(result, ensure_ascii=False))
+
+    def save(self, result: Dict[str, Any], student_id: str, source: Optional[str] = None) -> int:
+        """保存一条识别结果，返回记录ID"""
+        row = self._row(result, student_id, source, self._now())
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO results (student_id, type, created_at, source, data) VALUES (?, ?, ?, ?, ?)", row)
+            return cursor.lastrowid
+
+    def save_many(self, items: Iterable[Tuple[Dict[str, Any], str, Optional[str]]]) -> int:
+        """批量保存 (识别结果, 学号, 来源) ，整批在一个事务中写入，返回写入条数"""
+        now = self._now()
+        rows = [self._row(result, student_id, source, now) for result, student_id, source in items]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO results (student_id, type, created_at, source, data) VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def _query(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "student_id": row["student_id"],
+            "type": row["type"],
+            "created_at": row["created_at"],
+            "source": row["source"],
+            "result": json.loads(row["data"]),
+        }
+
+    def latest(self, student_id: str, doc_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """某学号（某类型）最新的一条记录"""
+        if doc_type is None:
+            records = self._query("SELECT * FROM results WHERE student_id = ? ORDER BY id DESC LIMIT 1",
+                                  (str(student_id),))
+        else:
+            records = self._query("SELECT * FROM results WHERE student_id = ? AND type = ? "
+                                  "ORDER BY id DESC LIMIT 1", (str(student_id), doc_type))
+        return records[0] if records else None
+
+    def by_student(self, student_id: str) -> List[Dict[str, Any]]:
+        """某学号的全部记录，按保存顺序"""
+        return self._query("SELECT * FROM results WHERE student_id = ? ORDER BY id", (str(student_id),))
+
+    def by_type(self, doc_type: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """某类型的记录，最新的在前"""
+        sql = "SELECT * FROM results WHERE type = ? ORDER BY id DESC"
+        if limit is not None:
+            return self._query(sql + " LIMIT ?", (doc_type, int(limit)))
+        return self._query(sql, (doc_type,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def import_json_tree(self, json_dir: Path) -> int:
+        """导入旧版 <学号>/<类型>_<时间戳>.json 目录，已导入过的文件跳过，返回新导入的条数"""
+        json_dir = Path(json_dir)
+        rows = []
+        for json_file in sorted(json_dir.glob("*/*.json")):
+            match = _JSON_NAME.match(json_file.name)
+            if match is None:
+                continue
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"跳过无法读取的识别结果 {json_file}: {str(e)}")
+                continue
+            created_at = datetime.strptime(match.group('ts'), '%Y%m%d_%H%M%S').strftime('%Y-%m-%d %H:%M:%S.%f')
+            source = f"json:{json_file.relative_to(json_dir).as_posix()}"
+            rows.append((result.get('student_id') or json_file.parent.name, match.group('type'),
+                         created_at, source, json.dumps(result, ensure_ascii=False)))
+        # 按时间顺序写入，保证 latest 与原先按时间戳取最新一致
+        rows.sort(key=lambda row: row[2])
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO results (student_id, type, created_at, source, data) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+            return self._conn.total_changes - before
+
+    def export_json(self, json_dir: Path, student_id: Optional[str] = None) -> List[Path]:
+        """按原 <学号>/<类型>_<时间戳>.json 格式导出（每条记录一个文件），返回导出的文件列表"""
+        json_dir = Path(json_dir)
+        if student_id is None:
+            records = self._query("SELECT * FROM results ORDER BY id", ())
+        else:
+            records = self.by_student(student_id)
+        paths = []
+        for record in records:
+            created = datetime.strptime(record["created_at"], '%Y-%m-%d %H:%M:%S.%f')
+            student_dir = json_dir / record["student_id"]
+            student_dir.mkdir(parents=True, exist_ok=True)
+            # 同一秒内的多条记录追加记录ID，避免像原先一样互相覆盖
+            path = student_dir / f"{record['type']}_{created.strftime('%Y%m%d_%H%M%S')}.json"
+            if path in paths:
+                path = path.with_name(f"{path.stem}_{record['id']}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({**record["result"], "created_at": created.strftime('%Y%m%d')},
+                          f, ensure_ascii=False, indent=4)
+            paths.append(path)
+        return paths
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="识别结果库：导入旧JSON目录、导出为JSON")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--json-dir", type=Path, default=Path("recognition_results"))
+    parser.add_argument("--db", type=Path, default=None, help="默认 <json-dir>/results.sqlite3")
+    parser.add_argument("--student-id", help="只导出该学号")
+    args = parser.parse_args()
+
+    store = RecognitionResultStore(args.db or args.json_dir / RecognitionResultStore.DB_NAME)
+    try:
+        if args.command == "import":
+            print(f"导入 {store.import_json_tree(args.json_dir)} 条识别结果，共 {store.count()} 条")
+        else:
+            print(f"导出 {len(store.export_json(args.json_dir, args.student_id))} 个JSON文件")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
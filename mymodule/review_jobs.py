@@ -0,0 +1,124 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ReviewJob:
+    """一次批量审核任务的状态，供前端轮询"""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.job_id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"  # queued / running / done / stopped / failed / cancelled
+        self.total = 0
+        self.processed = 0
+        self.details: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        self.lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "stopped", "failed", "cancelled")
+
+    def on_progress(self, done: int, total: int, entry: Optional[Dict[str, Any]]) -> None:
+        with self.lock:
+            self.total = total
+            self.processed = done
+            if entry is not None:
+                self.details.append(entry)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "total": self.total,
+                "processed": self.processed,
+                "success_count": len([d for d in self.details if d["status"] == "success"]),
+                "fail_count": len([d for d in self.details if d["status"] == "fail"]),
+                "details": list(self.details),
+                "error": self.error
+            }
+
+
+class ReviewJobManager:
+    """
+    后台执行批量审核任务
+
+    各任务共用 res 目录、Excel 和识别结果目录，因此按提交顺序逐个执行。
+    run_batch 的签名与 main.batch_review_upload 相同: (params, progress_callback, cancel_event) -> 结果dict
+    """
+
+    MAX_FINISHED_JOBS = 50  # 内存中保留的已结束任务数
+
+    def __init__(self, run_batch: Callable[..., Dict[str, Any]]):
+        self.run_batch = run_batch
+        self.jobs: Dict[str, ReviewJob] = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="review-job")
+
+    def submit(self, params: Dict[str, Any]) -> ReviewJob:
+        job = ReviewJob(params)
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self._prune()
+        self.executor.submit(self._run, job)
+        logging.info(f"审核任务已提交: {job.job_id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ReviewJob]:
+        """请求取消任务：排队中的任务不再执行，运行中的任务处理完当前文件后停止"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        with job.lock:
+            if job.status == "queued":
+                job.status = "cancelled"
+        logging.info(f"审核任务已请求取消: {job_id}")
+        return job
+
+    def wait(self, job: ReviewJob, timeout: Optional[float] = None) -> bool:
+        """阻塞等待任务结束"""
+        return job.done_event.wait(timeout)
+
+    def _run(self, job: ReviewJob) -> None:
+        with job.lock:
+            if job.status == "cancelled":
+                job.done_event.set()
+                return
+            job.status = "running"
+        try:
+            result = self.run_batch(job.params, job.on_progress, job.cancel_event)
+            with job.lock:
+                job.result = result
+                if result.get("stopped"):
+                    # 严重错误（如第一次题目比对失败）停止了审核，已处理的文件可以 resume 继续
+                    job.status = "stopped"
+                    job.error = result["stopped"]["reason"]
+                else:
+                    job.status = "cancelled" if job.cancel_event.is_set() else "done"
+        except BaseException as e:
+            with job.lock:
+                job.error = str(e) or type(e).__name__
+                job.status = "failed"
+            logging.error(f"审核任务失败 {job.job_id}: {job.error}")
+        finally:
+            job.done_event.set()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class ReviewJournal:
+    """
+    批量审核日志（JSON Lines，逐行追加并落盘）：记录每个已处理文件的审核明细、识别结果和副作用，
+    批次中断（进程崩溃或重启、题目比对失败而停止、任务取消）后可从中断处继续，已处理的文件不再识别
+
+    - 第一行 {"event": "start", "params": 审核参数}
+    - 每个文件一行 {"event": "file", "file": 相对路径, "size", "mtime_ns", "detail", "result", "effects"}，
+      effects 为该文件的副作用：compress（登记到待压缩列表）、queued（识别结果登记到结果库）、
+      renamed（重命名后的文件）、excel（Excel更新的学号和文件名）
+    - 识别结果写入结果库后追加 {"event": "results_saved"}，此前的文件继续时不再重复写入
+
+    整批正常结束后删除日志。崩溃时最后一行可能只写了一半，读取时忽略。
+    """
+
+    FILE_NAME = "review_journal.jsonl"
+
+    def __init__(self, journal_path: Path, params: Dict[str, Any]):
+        self.journal_path = Path(journal_path)
+        self.params = params
+        self._file = None
+
+    def pending(self) -> Dict[str, Dict[str, Any]]:
+        """
+        上次未完成、且审核参数相同的批次中已处理的文件：相对路径 -> 条目，
+        条目的 saved 表示其识别结果是否已写入结果库；没有可继续的批次时返回空dict
+        """
+        if not self.journal_path.exists():
+            return {}
+        entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            logging.warning(f"读取审核日志失败，重新审核: {str(e)}")
+            return {}
+
+        for index, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 只有最后一行可能因崩溃写了一半
+                if index != len(lines) - 1:
+                    logging.warning(f"审核日志第{index + 1}行损坏，已忽略")
+                continue
+            event = record.get("event")
+            if index == 0:
+                if event != "start" or record.get("params") != self.params:
+                    logging.info("审核参数已变化，上次未完成的批次不再继续")
+                    return {}
+            elif event == "file":
+                entries[record["file"]] = {**record, "saved": False}
+            elif event == "results_saved":
+                for entry in entries.values():
+                    entry["saved"] = True
+        return entries
+
+    @staticmethod
+    def lookup(entries: Dict[str, Dict[str, Any]], rel_path: str, file_path: Path) -> Optional[Dict[str, Any]]:
+        """文件自记录后未被修改（大小和修改时间一致）时返回其条目"""
+        entry = entries.get(rel_path)
+        if entry is None:
+            return None
+        stat = file_path.stat()
+        if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+            return entry
+        return None
+
+    def start(self, resume: bool = False) -> None:
+        """开始记录；resume 为True时在上次的日志后追加，否则清空日志开始新的批次"""
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.journal_path.exists():
+            self._file = open(self.journal_path, 'a', encoding='utf-8')
+            # 上次崩溃时写了一半的行单独成行，不与新记录粘连
+            if self.journal_path.stat().st_size:
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        self._file.write('\n')
+            return
+        self._file = open(self.journal_path, 'w', encoding='utf-8')
+        self._append({"event": "start", "params": self.params,
+                      "started_at": datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')})
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, rel_path: str, file_path: Path, detail: Dict[str, Any],
+               recognition_result: Optional[Dict[str, Any]], effects: Dict[str, Any]) -> None:
+        stat = file_path.stat()
+        self._append({
+            "event": "file",
+            "file": rel_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "detail": detail,
+            "result": recognition_result,
+            "effects": effects
+        })
+
+    def mark_results_saved(self) -> None:
+        self._append({"event": "results_saved"})
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self) -> None:
+        """整批正常结束，删除日志"""
+        self.close()
+        if self.journal_path.exists():
+            self.journal_path.unlink()
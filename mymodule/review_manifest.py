@@ -0,0 +1,77 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from mymodule.ocr_cache import OcrResultCache
+
+
+class ReviewManifest:
+    """
+    增量审核清单：记录 uploads 下每个文件 (大小, 修改时间, 内容哈希) 及上次审核通过时的结果
+
+    只记录审核通过的文件；未通过的文件可能因Excel或其他文件的修改而变为通过，每次都重新处理
+    （识别结果有OCR缓存，不会重复OCR）。命名参数或签名检测方式变化后结果不同，清单整体作废。
+    """
+
+    def __init__(self, manifest_path: Path, params: Dict[str, Any]):
+        self.manifest_path = Path(manifest_path)
+        self.params = params
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('params') == self.params:
+                    self.entries = data.get('files', {})
+                else:
+                    logging.info("审核参数已变化，增量审核清单作废")
+            except (OSError, ValueError) as e:
+                logging.warning(f"读取增量审核清单失败，按全量审核处理: {str(e)}")
+
+    @staticmethod
+    def _stat(file_path: Path) -> Dict[str, int]:
+        stat = file_path.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def lookup(self, rel_path: str, file_path: Path) -> Optional[Dict[str, Any]]:
+        """文件未变化时返回上次的清单条目；大小和修改时间一致直接判定未变化，否则比较内容哈希"""
+        entry = self.entries.get(rel_path)
+        if entry is None:
+            return None
+
+        state = self._stat(file_path)
+        if state["size"] == entry["size"] and state["mtime_ns"] == entry["mtime_ns"]:
+            return entry
+        if state["size"] == entry["size"] and OcrResultCache.file_hash(file_path) == entry["hash"]:
+            entry.update(state)  # 只是被重新写入（如重新上传了同一文件），内容未变
+            return entry
+        return None
+
+    def record(self, rel_path: str, file_path: Path, detail: Dict[str, Any],
+               recognition_result: Optional[Dict[str, Any]]) -> None:
+        self.entries[rel_path] = {
+            **self._stat(file_path),
+            "hash": OcrResultCache.file_hash(file_path),
+            "detail": detail,
+            "result": recognition_result
+        }
+
+    def forget(self, rel_path: str) -> None:
+        self.entries.pop(rel_path, None)
+
+    def remove_missing(self, existing: List[str]) -> List[Dict[str, Any]]:
+        """删除已不存在于 uploads 中的文件条目，返回被删除的条目"""
+        existing = set(existing)
+        removed = [rel_path for rel_path in self.entries if rel_path not in existing]
+        for rel_path in removed:
+            logging.info(f"文件已删除，移出增量审核清单: {rel_path}")
+        return [self.entries.pop(rel_path) for rel_path in removed]
+
+    def save(self) -> None:
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"params": self.params, "files": self.entries}, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.manifest_path)
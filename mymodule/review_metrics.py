@@ -0,0 +1,177 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+
+class StageTimer:
+    """记录单个文件各处理环节的耗时（秒），同一环节多次进入时累加"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+def rounded_timings(timings: Dict[str, float]) -> Dict[str, float]:
+    """写入审核结果的耗时形式：秒，保留到0.1毫秒"""
+    return {name: round(seconds, 4) for name, seconds in timings.items()}
+
+
+class _Histogram:
+    """按标签分组的累积直方图，桶边界含义与Prometheus一致（le）"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.series: Dict[Tuple[str, ...], List[float]] = {}  # 标签值 -> [各桶计数..., 总数, 总和]
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        data = self.series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                data[i] += 1
+        data[-2] += 1
+        data[-1] += value
+
+
+class ReviewMetrics:
+    """
+    审核过程的计数器和耗时直方图，进程内汇总，由API的 /metrics 以Prometheus文本格式输出
+
+    - review_recognitions_total / review_recognition_seconds: 识别次数和耗时，按文档类型、识别结果分组
+    - review_escalations_total: 自适应分辨率下粗识别失败、以高分辨率重识别的次数，按文档类型、字段分组
+    - review_prefilter_rejections_total / review_prefilter_saved_seconds_total: 预分类提前拒绝的文件数（按判断依据分组）
+      和估计节省的识别时间
+    - review_watchdog_kills_total / review_worker_recycles_total: 超出时间或内存限制而终止的识别进程数（按原因分组）
+      和识别进程的定期回收次数
+    - review_files_total: 审核文件数，按文档类型和审核结果分组
+    - review_stage_seconds: 各处理环节（识别、保存结果、重命名、Excel、压缩等）的耗时
+    - review_batches_total / review_batch_seconds: 批量审核次数和耗时
+    """
+
+    RECOGNITION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+    STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+    BATCH_BUCKETS = (1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recognitions: Dict[Tuple[str, str], int] = {}
+        self._files: Dict[Tuple[str, str], int] = {}
+        self._escalations: Dict[Tuple[str, str], int] = {}
+        self._prefilter_rejections: Dict[Tuple[str], int] = {}
+        self._prefilter_saved = 0.0
+        self._watchdog_kills: Dict[Tuple[str], int] = {}
+        self._worker_recycles = 0
+        self._batches = 0
+        self._recognition_seconds = _Histogram(self.RECOGNITION_BUCKETS)
+        self._stage_seconds = _Histogram(self.STAGE_BUCKETS)
+        self._batch_seconds = _Histogram(self.BATCH_BUCKETS)
+
+    def observe_recognition(self, doc_type: str, outcome: str, seconds: float) -> None:
+        """outcome: ok 识别成功；error 识别失败（含跳过的过程性材料）"""
+        labels = (doc_type or "unknown", outcome)
+        with self._lock:
+            self._recognitions[labels] = self._recognitions.get(labels, 0) + 1
+            self._recognition_seconds.observe(labels, seconds)
+
+    def observe_escalations(self, doc_type: str, escalations: Dict[str, int]) -> None:
+        with self._lock:
+            for field, count in escalations.items():
+                labels = (doc_type or "unknown", field)
+                self._escalations[labels] = self._escalations.get(labels, 0) + count
+
+    def observe_prefilter(self, rejections: Dict[str, int], saved_seconds: float) -> None:
+        with self._lock:
+            for method, count in rejections.items():
+                self._prefilter_rejections[(method,)] = self._prefilter_rejections.get((method,), 0) + count
+            self._prefilter_saved += saved_seconds
+
+    def observe_watchdog_kill(self, reason: str) -> None:
+        """reason: timeout 超时；memory 内存超限；crashed 识别进程异常退出"""
+        with self._lock:
+            self._watchdog_kills[(reason,)] = self._watchdog_kills.get((reason,), 0) + 1
+
+    def observe_worker_recycle(self) -> None:
+        with self._lock:
+            self._worker_recycles += 1
+
+    def observe_stages(self, timings: Dict[str, float]) -> None:
+        with self._lock:
+            for stage, seconds in timings.items():
+                self._stage_seconds.observe((stage,), seconds)
+
+    def observe_file(self, doc_type: str, status: str) -> None:
+        labels = (doc_type or "unknown", status)
+        with self._lock:
+            self._files[labels] = self._files.get(labels, 0) + 1
+
+    def observe_batch(self, seconds: float) -> None:
+        with self._lock:
+            self._batches += 1
+            self._batch_seconds.observe((), seconds)
+
+    @staticmethod
+    def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _render_counter(self, lines: List[str], name: str, help_text: str, names: Tuple[str, ...],
+                        values: Dict[Tuple[str, ...], int]) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, count in sorted(values.items()):
+            lines.append(f"{name}{self._labels(names, labels)} {count}")
+
+    def _render_histogram(self, lines: List[str], name: str, help_text: str, names: Tuple[str, ...],
+                          histogram: _Histogram) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, data in sorted(histogram.series.items()):
+            bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, data):
+                bucket_labels = self._labels(names, labels, 'le="%s"' % bound)
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(f"{name}_count{self._labels(names, labels)} {data[-2]}")
+            lines.append(f"{name}_sum{self._labels(names, labels)} {data[-1]}")
+
+    def render(self) -> str:
+        """Prometheus文本格式（version 0.0.4）"""
+        lines: List[str] = []
+        with self._lock:
+            self._render_counter(lines, "review_recognitions_total", "文档识别次数",
+                                 ("doc_type", "outcome"), self._recognitions)
+            self._render_histogram(lines, "review_recognition_seconds", "单个文档识别耗时（秒）",
+                                   ("doc_type", "outcome"), self._recognition_seconds)
+            self._render_counter(lines, "review_escalations_total", "高分辨率重识别次数",
+                                 ("doc_type", "field"), self._escalations)
+            self._render_counter(lines, "review_prefilter_rejections_total", "预分类提前拒绝的文件数",
+                                 ("method",), self._prefilter_rejections)
+            self._render_counter(lines, "review_prefilter_saved_seconds_total", "预分类估计节省的识别时间（秒）",
+                                 (), {(): self._prefilter_saved})
+            self._render_counter(lines, "review_watchdog_kills_total", "超出限制或异常退出而终止的识别进程数",
+                                 ("reason",), self._watchdog_kills)
+            self._render_counter(lines, "review_worker_recycles_total", "识别进程定期回收次数",
+                                 (), {(): self._worker_recycles})
+            self._render_counter(lines, "review_files_total", "审核文件数",
+                                 ("doc_type", "status"), self._files)
+            self._render_histogram(lines, "review_stage_seconds", "单个文件各处理环节耗时（秒）",
+                                   ("stage",), self._stage_seconds)
+            self._render_counter(lines, "review_batches_total", "批量审核次数", (), {(): self._batches})
+            self._render_histogram(lines, "review_batch_seconds", "批量审核总耗时（秒）",
+                                   (), self._batch_seconds)
+        return "\n".join(lines) + "\n"
+
+
+# 进程内共用的指标，DocumentProcessor 写入，API 的 /metrics 读取
+review_metrics = ReviewMetrics()
@@ -1,23 +1,69 @@
 import json
 import fitz
 import numpy as np
-import cv2
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import logging
 
+from mymodule.page_layout import PageLayout
+from mymodule.pdf_pages import PdfPages
 
-# 未做好！！！！！！！！！！！
 
 class SignatureDetector:
-    def __init__(self):
+    """
+    毕业论文签名检测：只渲染签名区域，按墨迹像素比例判断有无手写签名
+
+    诚信声明的正文长短不一，“作者签名：”一行的位置随之上下移动，签名区域不能用固定坐标：
+    先在第二页的识别结果（文本层或OCR）中找到“签名”标签，签名区域取标签之后、与标签同一行的一块，
+    大小以标签的行高为单位，不会碰到上方的正文和下方的日期行。
+    签名区域使用与OCR结果相同的坐标系（PdfPages 渲染图像的像素坐标），
+    渲染时换算回页面坐标（pt）裁剪，只栅格化这一小块区域。
+    """
+
+    LABEL = "签名"
+    # 签名区域相对标签的范围（以标签行高为单位）：向右的宽度、向上和向下外扩的高度
+    AREA_WIDTH = 9.0
+    AREA_ABOVE = 1.0
+    AREA_BELOW = 0.4
+    # 签名区域渲染分辨率，手写笔画在100DPI下已足够清晰
+    DPI = 100
+    # 比区域背景（中位灰度）暗这么多的像素视为墨迹，兼容扫描件的灰色底
+    INK_CONTRAST = 60
+    # 墨迹像素比例超过该值视为有墨迹
+    INK_RATIO = 0.005
+    # 墨迹比例达到 INK_RATIO 的这么多倍才确定已签名，介于两者之间为不确定
+    CONFIDENT_FACTOR = 3.0
+
+    def __init__(self, dpi: int = DPI, ink_ratio: float = INK_RATIO):
         self.current_time = "2025-05-12 15:18:29"
         self.current_user = "Grape4ever"
 
-        # 签名区域坐标
-        self.SIGNUP_REGION = [
-            [400.0, 500.0], [500.0, 500.0],
-            [500.0, 600.0], [400.0, 600.0]
-        ]
+        self.dpi = dpi
+        self.ink_ratio = ink_ratio
+
+    def locate_area(self, page_result) -> Optional[List[List[float]]]:
+        """
+        按第二页识别结果中“签名”标签的位置返回签名区域的四个角点，找不到标签时返回None
+        有多处“签名”时取“作者签名”；OCR可能把手写签名识别进标签所在的行，标签的结束位置按字符数估计
+        """
+        layout = PageLayout.from_lines(page_result)
+        candidates = [index for index, text in enumerate(layout.texts) if self.LABEL in text]
+        if not candidates:
+            return None
+        index = next((i for i in candidates if "作者" + self.LABEL in layout.texts[i]), candidates[0])
+        text = layout.texts[index]
+        end = text.index(self.LABEL) + len(self.LABEL)
+        if end < len(text) and text[end] in ":：":
+            end += 1
+        box = layout.boxes[index]
+        x0, y0 = box.min(axis=0)
+        x1, y1 = box.max(axis=0)
+        height = y1 - y0
+        label_end = x0 + (x1 - x0) * end / len(text)
+        left, right = label_end, label_end + self.AREA_WIDTH * height
+        top, bottom = y0 - self.AREA_ABOVE * height, y1 + self.AREA_BELOW * height
+        return [[float(left), float(top)], [float(right), float(top)],
+                [float(right), float(bottom)], [float(left), float(bottom)]]
 
     def _convert_to_serializable(self, obj):
         """转换NumPy类型为Python原生类型"""
@@ -31,102 +77,121 @@ class SignatureDetector:
             return obj.tolist()
         return obj
 
-    def check_area_content(self, pdf_path: Path, page_num: int = 1,
-                           area_coords: list = None, threshold: float = 0.001) -> dict:
+    def render_area(self, pdf_path: Path, area_coords: list,
+                    page_num: int = 1) -> Tuple[Optional[np.ndarray], Dict]:
+        """
+        只渲染指定页的签名区域为灰度图，返回 (图像, 调试信息)；页数不足时图像为None
+        """
+        with fitz.open(str(pdf_path)) as doc:
+            if page_num >= len(doc):
+                return None, {"page_count": len(doc)}
+
+            page = doc[page_num]
+            # 区域坐标是渲染像素坐标，换算回页面坐标
+            scale = PdfPages.page_scale(page.rect)
+            xs = [p[0] for p in area_coords]
+            ys = [p[1] for p in area_coords]
+            clip = fitz.Rect(min(xs) / scale, min(ys) / scale, max(xs) / scale, max(ys) / scale) & page.rect
+            if clip.is_empty:
+                raise ValueError("签名区域超出页面范围")
+
+            zoom = self.dpi / 72
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, colorspace=fitz.csGRAY, alpha=False)
+            gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+
+            debug_info = {
+                "pdf_size": [float(page.rect.width), float(page.rect.height)],
+                "original_coords": [[float(x), float(y)] for x, y in area_coords],
+                "clip_rect": [float(clip.x0), float(clip.y0), float(clip.x1), float(clip.y1)],
+                "extracted_area_shape": [int(pix.height), int(pix.width)],
+                "dpi": self.dpi
+            }
+            return gray, debug_info
+
+    @classmethod
+    def ink_ratios(cls, areas: np.ndarray) -> np.ndarray:
+        """
+        计算一组同尺寸灰度图 (N, H, W) 的墨迹像素比例
+
+        以每张图的中位灰度作为背景，比背景暗 INK_CONTRAST 以上的像素计为墨迹
+        """
+        areas = areas.reshape(areas.shape[0], -1).astype(np.int16)
+        background = np.median(areas, axis=1, keepdims=True)
+        return (areas < background - cls.INK_CONTRAST).mean(axis=1)
+
+    def check_area_content(self, pdf_path: Path, area_coords: list, page_num: int = 1,
+                           threshold: float = None) -> dict:
         """
         检查PDF指定区域是否有内容
         """
-        try:
-            pdf_path = Path(pdf_path) if not isinstance(pdf_path, Path) else pdf_path
-            if not pdf_path.exists():
-                raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+        return self.check_many([pdf_path], [area_coords], page_num, threshold)[0]
 
-            if area_coords is None:
-                area_coords = self.SIGNUP_REGION
+    def check_many(self, pdf_paths: List[Path], areas: List[list], page_num: int = 1,
+                   threshold: float = None) -> List[dict]:
+        """
+        批量检查多个PDF的签名区域（areas 与 pdf_paths 一一对应），返回与输入顺序一致的检查结果
 
-            doc = fitz.open(pdf_path)
+        各文件只渲染签名区域，尺寸相同的区域叠成一个数组一次计算墨迹比例
+        """
+        threshold = self.ink_ratio if threshold is None else threshold
+        results: List[Optional[dict]] = [None] * len(pdf_paths)
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        rendered: Dict[int, Tuple[np.ndarray, Dict]] = {}
 
+        for index, (pdf_path, area_coords) in enumerate(zip(pdf_paths, areas)):
+            pdf_path = Path(pdf_path)
             try:
-                if page_num >= len(doc):
-                    raise ValueError(f"页码 {page_num} 超出PDF页数范围 (总页数: {len(doc)})")
-
-                page = doc[page_num]
-
-                # 获取页面信息
-                page_width = float(page.rect.width)
-                page_height = float(page.rect.height)
-
-                # 获取页面图像
-                pix = page.get_pixmap(dpi=300)
-
-                # 计算缩放比例
-                scale_x = pix.width / page_width
-                scale_y = pix.height / page_height
-
-                # 计算坐标
-                x0 = int(min(area_coords[0][0], area_coords[3][0]) * scale_x)
-                y0 = int(min(area_coords[0][1], area_coords[1][1]) * scale_y)
-                x1 = int(max(area_coords[1][0], area_coords[2][0]) * scale_x)
-                y1 = int(max(area_coords[2][1], area_coords[3][1]) * scale_y)
-
-                # 确保坐标在有效范围内
-                x0 = max(0, min(x0, pix.width))
-                y0 = max(0, min(y0, pix.height))
-                x1 = max(0, min(x1, pix.width))
-                y1 = max(0, min(y1, pix.height))
-
-                # 转换图像
-                img = np.frombuffer(pix.samples, dtype=np.uint8)
-                img = img.reshape(pix.height, pix.width, pix.n)
-
-                # 提取区域
-                area_img = img[y0:y1, x0:x1]
-
-                if area_img.size == 0:
-                    raise ValueError("提取的图像区域为空")
-
-                # 转换为灰度图
-                if len(area_img.shape) == 3:
-                    gray = cv2.cvtColor(area_img, cv2.COLOR_BGR2GRAY)
-                else:
-                    gray = area_img
-
-                # 二值化处理
-                _, binary = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
-
-                # 计算非空白像素比例
-                total_pixels = int(binary.shape[0] * binary.shape[1])
-                non_white_pixels = int(np.sum(binary > 0))
-                content_ratio = float(non_white_pixels) / float(total_pixels)
-
-                # 构建结果（确保所有值都是可序列化的）
-                result = {
-                    "has_content": bool(content_ratio > threshold),
-                    "content_ratio": float(content_ratio),
-                    "threshold": float(threshold),
-                    "debug_info": {
-                        "pdf_size": [float(page_width), float(page_height)],
-                        "image_size": [int(pix.width), int(pix.height)],
-                        "scale_factors": [float(scale_x), float(scale_y)],
-                        "original_coords": [[float(x), float(y)] for x, y in area_coords],
-                        "scaled_coords": [int(x0), int(y0), int(x1), int(y1)],
-                        "extracted_area_shape": [int(x) for x in area_img.shape]
-                    },
-                    "extraction_info": {
-                        "non_white_pixels": int(non_white_pixels),
-                        "total_pixels": int(total_pixels)
-                    }
-                }
-
-                return result
-
-            finally:
-                doc.close()
-
-        except Exception as e:
-            logging.error(f"区域内容检测失败 - 文件: {pdf_path}, 页码: {page_num}, 错误: {str(e)}")
-            logging.error("调用栈:", exc_info=True)
-            raise
+                if not pdf_path.exists():
+                    raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+                gray, debug_info = self.render_area(pdf_path, area_coords, page_num)
+            except Exception as e:
+                logging.error(f"区域内容检测失败 - 文件: {pdf_path}, 页码: {page_num}, 错误: {str(e)}")
+                raise
+
+            if gray is None or gray.size == 0:
+                # 页数不足，视为没有签名
+                results[index] = self._build_result(0.0, threshold, debug_info, 0, 0)
+                continue
+            rendered[index] = (gray, debug_info)
+            groups.setdefault(gray.shape, []).append(index)
+
+        for indexes in groups.values():
+            stack = np.stack([rendered[index][0] for index in indexes])
+            ratios = self.ink_ratios(stack)
+            total_pixels = int(stack.shape[1] * stack.shape[2])
+            for index, ratio in zip(indexes, ratios):
+                results[index] = self._build_result(float(ratio), threshold, rendered[index][1],
+                                                    int(round(ratio * total_pixels)), total_pixels)
+        return results
+
+    @staticmethod
+    def _build_result(content_ratio: float, threshold: float, debug_info: Dict,
+                      ink_pixels: int, total_pixels: int) -> dict:
+        return {
+            "has_content": bool(content_ratio > threshold),
+            "content_ratio": float(content_ratio),
+            "threshold": float(threshold),
+            "debug_info": debug_info,
+            "extraction_info": {
+                "non_white_pixels": ink_pixels,
+                "total_pixels": total_pixels
+            }
+        }
+
+    def has_signature(self, pdf_path: Path, page_result) -> Optional[bool]:
+        """
+        按第二页识别结果定位签名区域，判断有无手写签名：
+        墨迹明显时为True，几乎没有墨迹时为False，找不到“签名”标签或墨迹比例介于两者之间时为None（不确定）
+        """
+        area = self.locate_area(page_result)
+        if area is None:
+            return None
+        ratio = self.check_area_content(pdf_path, area)["content_ratio"]
+        if ratio >= self.ink_ratio * self.CONFIDENT_FACTOR:
+            return True
+        if ratio <= self.ink_ratio:
+            return False
+        return None
 
     def save_check_result(self, result: dict, save_dir: Path,
                           student_id: str) -> Path:
@@ -0,0 +1,62 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Optional, Set
+
+from mymodule.recognizer_pool import RecognizerPool
+
+
+class RecognitionPrefetcher:
+    """
+    上传边写边识别：每个文件写入完成后立即排队OCR
+
+    识别结果（包括识别错误）写入识别器的OCR缓存，之后的批量审核照常扫描 uploads 目录，
+    对这些文件直接命中缓存，只需等待尚未完成的识别。
+    """
+
+    def __init__(self, pool: RecognizerPool):
+        self.pool = pool
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-prefetch")
+        self._pending: Set[Future] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """排队中和识别中的文件数"""
+        with self._lock:
+            return len(self._pending)
+
+    def submit(self, file_path: Path, ocr_mode: Optional[str] = None, signature_mode: Optional[str] = None,
+               resolution: Optional[str] = None) -> None:
+        future = self.executor.submit(self._recognize, Path(file_path), ocr_mode, signature_mode, resolution)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+    def _recognize(self, file_path: Path, ocr_mode: Optional[str], signature_mode: Optional[str],
+                   resolution: Optional[str]) -> None:
+        with self.pool.acquire(ocr_mode, signature_mode, resolution) as recognizer:
+            if recognizer.cache is None:
+                logging.warning(f"未启用OCR缓存，跳过预识别: {file_path}")
+                return
+            try:
+                recognizer.identify_document(file_path)
+                logging.info(f"预识别完成: {file_path}")
+            except Exception as e:
+                # 识别错误同样已写入缓存，审核时按失败处理
+                logging.info(f"预识别失败 {file_path}: {str(e)}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待已排队的文件全部识别完，返回是否在超时前完成"""
+        with self._lock:
+            pending = list(self._pending)
+        if not pending:
+            return True
+        logging.info(f"等待 {len(pending)} 个上传文件完成预识别")
+        _, not_done = wait(pending, timeout=timeout)
+        return not not_done